@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cluster Nearest-Neighbour and Representative-Construct Index
+Build a KD-tree over the UMAP coordinates, precompute per-cluster medoids,
+central and boundary points, and answer "nearest constructs" queries
+"""
+
+import argparse
+import os
+import pickle
+import sys
+
+INDEX_FILE = "cluster_index.pkl"
+REPRESENTATIVES_FILE = "cluster_representatives.csv"
+
+# Number of central/boundary points reported per cluster
+DEFAULT_TOP_K = 5
+# Neighbours inspected when scoring how close a point lies to another cluster
+BOUNDARY_NEIGHBOURS = 10
+# Medoid candidates (nearest to the centroid) evaluated exactly per cluster
+MEDOID_CANDIDATES = 256
+
+def _construct_text(df):
+    """Bipolar construct text for every row"""
+    import pandas as pd
+
+    if 'pole_a' in df.columns and 'pole_b' in df.columns:
+        text = df['pole_a'].astype(str) + ' vs ' + df['pole_b'].astype(str)
+        return text.where(df['pole_a'].notna())
+    if 'construct_bipolar' in df.columns:
+        return df['construct_bipolar']
+    return pd.Series(None, index=df.index, dtype=object)
+
+def build_index(df, cluster_col='cluster_7'):
+    """Build the KD-tree index over unique (pid, x, y) points
+
+    The merged dataset repeats each coordinate once per construct, so the tree is
+    built over unique points and each point stores its constructs pre-joined into
+    one string. Queries then only touch the k points they return.
+    """
+    from scipy.spatial import cKDTree
+
+    rows = df[['pid', 'x', 'y', cluster_col]].copy()
+    rows['construct'] = _construct_text(df)
+
+    points = (
+        rows[['pid', 'x', 'y', cluster_col]]
+        .drop_duplicates(subset=['pid', 'x', 'y'])
+        .rename(columns={cluster_col: 'cluster'})
+        .reset_index(drop=True)
+    )
+    points['point_id'] = points.index
+
+    constructs = rows.merge(points[['pid', 'x', 'y', 'point_id']], on=['pid', 'x', 'y'], how='left')
+    joined = (
+        constructs.dropna(subset=['construct'])
+        .groupby('point_id')['construct']
+        .agg(lambda values: '; '.join(dict.fromkeys(values)))
+    )
+    points['constructs'] = joined.reindex(points['point_id']).fillna('').values
+
+    return _with_lookups({'points': points}, cKDTree)
+
+def _with_lookups(index, tree_class):
+    """Add the derived lookups: the KD-tree and the point ids of every pid"""
+    points = index['points']
+    index['tree'] = tree_class(points[['x', 'y']].values)
+    index['pid_points'] = points.groupby('pid').indices
+    return index
+
+def save_index(index, index_file):
+    """Persist the index point table with pickle
+
+    The KD-tree and pid lookup are rebuilt on load (O(n log n)) because pickled
+    cKDTree objects are not byte-for-byte reproducible, which would defeat the
+    output manifest.
+    """
+    with open(index_file, 'wb') as f:
+        pickle.dump({'points': index['points']}, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+def load_index(index_file):
+    """Load an index written by save_index and rebuild its lookups"""
+    from scipy.spatial import cKDTree
+
+    if not os.path.exists(index_file):
+        raise FileNotFoundError(f"{index_file} not found - run the 'index' subcommand first")
+    with open(index_file, 'rb') as f:
+        index = pickle.load(f)
+    if 'constructs' not in index['points'].columns:
+        raise ValueError(f"{index_file} was written by an older version - run the 'index' subcommand again")
+    return _with_lookups(index, cKDTree)
+
+def _point_constructs(index, point_ids):
+    """The joined constructs of the given points, one string per point"""
+    return list(index['points']['constructs'].values[point_ids])
+
+def _medoid(cluster_points):
+    """Index (within cluster_points) of the point with the smallest total distance
+
+    Only the MEDOID_CANDIDATES points nearest the centroid are evaluated, which is
+    exact for small clusters and avoids an O(m²) distance matrix for large ones.
+    """
+    import numpy as np
+    from scipy.spatial.distance import cdist
+
+    coords = cluster_points[['x', 'y']].values
+    centroid = coords.mean(axis=0)
+    to_centroid = np.linalg.norm(coords - centroid, axis=1)
+    n_candidates = min(MEDOID_CANDIDATES, len(coords))
+    candidates = np.argpartition(to_centroid, n_candidates - 1)[:n_candidates]
+    total_distance = cdist(coords[candidates], coords).sum(axis=1)
+    return int(candidates[np.argmin(total_distance)])
+
+def compute_representatives(index, top_k=DEFAULT_TOP_K):
+    """Per cluster: the medoid, the top_k most central and top_k boundary points"""
+    import numpy as np
+    import pandas as pd
+
+    points = index['points']
+    tree = index['tree']
+    labels = points['cluster'].values
+
+    # Boundary score: share of a point's nearest neighbours that belong to other clusters
+    n_neighbours = min(BOUNDARY_NEIGHBOURS + 1, len(points))
+    _, neighbour_ids = tree.query(points[['x', 'y']].values, k=n_neighbours)
+    neighbour_ids = np.asarray(neighbour_ids).reshape(len(points), -1)[:, 1:]
+    if neighbour_ids.shape[1]:
+        boundary_score = (labels[neighbour_ids] != labels[:, None]).mean(axis=1)
+    else:
+        boundary_score = np.zeros(len(points))
+
+    records = []
+    for cluster in sorted(points['cluster'].unique()):
+        cluster_points = points[points['cluster'] == cluster]
+        coords = cluster_points[['x', 'y']].values
+        medoid_position = _medoid(cluster_points)
+        to_medoid = np.linalg.norm(coords - coords[medoid_position], axis=1)
+        scores = boundary_score[cluster_points.index]
+
+        # Central: closest to the medoid (the medoid itself comes first)
+        central = np.argsort(to_medoid, kind='stable')[:top_k + 1]
+        # Boundary: most mixed neighbourhoods, furthest from the medoid on ties
+        boundary = np.lexsort((-to_medoid, -scores))[:top_k]
+
+        for role, positions in [('medoid', central[:1]), ('central', central[1:]), ('boundary', boundary)]:
+            point_ids = cluster_points['point_id'].values[positions]
+            for rank, (position, construct) in enumerate(zip(positions, _point_constructs(index, point_ids)), 1):
+                row = cluster_points.iloc[position]
+                records.append({
+                    'Cluster': cluster,
+                    'Role': role,
+                    'Rank': rank,
+                    'Conversation ID': row['pid'],
+                    'X': row['x'],
+                    'Y': row['y'],
+                    'Distance To Medoid': round(float(to_medoid[position]), 4),
+                    'Boundary Score': round(float(scores[position]), 2),
+                    'Constructs': construct
+                })
+
+    return pd.DataFrame(records)
+
+def nearest_constructs(index, x, y, k=10):
+    """The constructs at the k points nearest to (x, y)"""
+    import numpy as np
+
+    k = min(k, len(index['points']))
+    distances, point_ids = index['tree'].query([x, y], k=k)
+    return _neighbour_table(index, np.atleast_1d(point_ids), np.atleast_1d(distances))
+
+def nearest_to_pid(index, pid, k=10):
+    """The constructs at the k points nearest to any point of a conversation"""
+    import numpy as np
+
+    points = index['points']
+    if pid not in index['pid_points']:
+        raise KeyError(f"Conversation ID not in index: {pid}")
+    own = points.iloc[index['pid_points'][pid]]
+
+    # Over-fetch so that k neighbours remain after dropping the pid's own points
+    n_query = min(k + len(own), len(points))
+    distances, point_ids = index['tree'].query(own[['x', 'y']].values, k=n_query)
+    distances = np.asarray(distances).reshape(len(own), -1).ravel()
+    point_ids = np.asarray(point_ids).reshape(len(own), -1).ravel()
+
+    best = {}
+    for point_id, distance in zip(point_ids, distances):
+        if points.at[point_id, 'pid'] != pid and distance < best.get(point_id, np.inf):
+            best[point_id] = distance
+    nearest = sorted(best.items(), key=lambda item: item[1])[:k]
+    return _neighbour_table(index, np.array([p for p, _ in nearest], dtype=int),
+                            np.array([d for _, d in nearest]))
+
+def _neighbour_table(index, point_ids, distances):
+    """Result table for a nearest-neighbour query"""
+    import pandas as pd
+
+    points = index['points'].loc[point_ids]
+    return pd.DataFrame({
+        'Distance': distances.round(4),
+        'Conversation ID': points['pid'].values,
+        'Cluster': points['cluster'].values,
+        'X': points['x'].values,
+        'Y': points['y'].values,
+        'Constructs': _point_constructs(index, point_ids)
+    })
+
+def build_and_save(df, output_dir, top_k=DEFAULT_TOP_K):
+    """Build the index, persist it and save the per-cluster representatives"""
+    print("Building nearest-neighbour index...")
+    os.makedirs(output_dir, exist_ok=True)
+
+    index = build_index(df)
+    index_file = os.path.join(output_dir, INDEX_FILE)
+    save_index(index, index_file)
+    print(f"✅ Saved nearest-neighbour index ({len(index['points']):,} points): {index_file}")
+
+    representatives = compute_representatives(index, top_k)
+    representatives_file = os.path.join(output_dir, REPRESENTATIVES_FILE)
+    representatives.to_csv(representatives_file, index=False)
+    print(f"✅ Saved cluster representatives: {representatives_file}")
+
+    return index, representatives
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    from final_constructs_cluster_analysis import FINAL_OUTPUT_DIR, positive_int
+
+    parser = argparse.ArgumentParser(description="Query the cluster nearest-neighbour index")
+    parser.add_argument('--index-file', default=os.path.join(FINAL_OUTPUT_DIR, INDEX_FILE),
+                        help="index written by the index step")
+    parser.add_argument('--k', type=positive_int, default=10, help="number of neighbours")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--pid', help="conversation ID to find neighbours for")
+    target.add_argument('--xy', nargs=2, type=float, metavar=('X', 'Y'), help="UMAP coordinates")
+    return parser.parse_args(argv)
+
+def print_nearest(index_file, pid=None, xy=None, k=10):
+    """Load the index and print the constructs nearest to a pid or a coordinate
+
+    Returns the exit code: 1 if the conversation ID is not in the index.
+    """
+    import pandas as pd
+
+    index = load_index(index_file)
+    if pid:
+        try:
+            result = nearest_to_pid(index, pid, k)
+        except KeyError:
+            print(f"❌ Conversation ID not in index: {pid}")
+            return 1
+    else:
+        result = nearest_constructs(index, xy[0], xy[1], k)
+
+    with pd.option_context('display.max_colwidth', 80, 'display.width', 200):
+        print(result.to_string(index=False))
+    return 0
+
+def main(argv=None):
+    """Main function"""
+    args = parse_args(argv)
+    return print_nearest(args.index_file, args.pid, args.xy, args.k)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,39 +5,170 @@ Re-cluster Original Data to 7 Clusters with Survey Integration
 Take the original UMAP coordinates with conversation_ids and re-cluster to 7 groups
 """
 
-import pandas as pd
-import numpy as np
-from sklearn.cluster import AgglomerativeClustering
-import plotly.graph_objects as go
-import plotly.express as px
-from scipy.spatial import ConvexHull
+import argparse
+import importlib
 import os
+import sys
+import time
 
-def load_and_recluster_data():
+# Input/output locations (relative to the working directory)
+COORDINATES_FILE = "../umap_coordinates.csv"
+SURVEY_FILE = "pid to survey.csv"
+RECLUSTERED_FILE = "umap_coordinates_7clusters_with_surveys.csv"
+FINAL_OUTPUT_DIR = "../final version of constructs cluster"
+DATA_QUALITY_FILE = "data_quality_report.txt"
+
+# Files described in dataset_summary.txt (listed when present in the output folder)
+SUMMARY_FILES = [
+    ("constructs_cluster_dataset.csv", "Clean dataset for analysis"),
+    ("interactive_constructs_cluster_visualization.html", "Interactive visualization"),
+    ("cluster_analysis_statistics.csv", "Cluster statistics"),
+    ("survey_analysis_statistics.csv", "Survey statistics"),
+    ("survey_cluster_contingency.csv", "Survey x cluster point counts"),
+    ("survey_cluster_enrichment.csv", "Survey x cluster observed/expected ratios"),
+    ("survey_overlap_jaccard.csv", "Survey x survey overlap of conversation IDs"),
+    ("survey_cluster_independence.txt", "Chi-square test of survey x cluster independence"),
+    ("survey_comparison_heatmap.html", "Enrichment and overlap heatmaps"),
+    ("complete_processed_dataset.csv", "Full processed dataset"),
+    ("README.md", "Documentation and usage guide")
+]
+
+# Heavy dependencies (pandas, sklearn, plotly, scipy) are imported on first use
+# through _import() so that each subcommand only pays for what it needs.
+_IMPORT_TIMES = {}
+_START_TIME = time.perf_counter()
+
+def _import(module_name):
+    """Import a module on first use and record how long the import took"""
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    _IMPORT_TIMES[module_name] = time.perf_counter() - start
+    return module
+
+def print_import_report():
+    """Print the time spent importing heavy dependencies during this run"""
+    total_imports = sum(_IMPORT_TIMES.values())
+    total_runtime = time.perf_counter() - _START_TIME
+    print(f"\n=== IMPORT TIME REPORT ===")
+    if not _IMPORT_TIMES:
+        print("- No heavy dependencies were imported")
+    for module_name, seconds in sorted(_IMPORT_TIMES.items(), key=lambda item: -item[1]):
+        print(f"- {module_name}: {seconds * 1000:.0f} ms")
+    print(f"- Total import time: {total_imports * 1000:.0f} ms")
+    print(f"- Total runtime: {total_runtime * 1000:.0f} ms")
+
+def deduplicate_points(coords):
+    """Find the unique (pid, x, y) points among rows with valid coordinates
+    
+    Rows are hashed with pandas' vectorized hash_pandas_object and factorized, so
+    duplicates are found in a single pass. Returns (valid_mask, codes, unique_positions):
+    codes[i] is the unique-point number of the i-th valid row and unique_positions
+    holds the first valid row (position) for each unique point.
+    """
+    pd = _import('pandas')
+    np = _import('numpy')
+    
+    valid_mask = coords[['x', 'y']].notna().all(axis=1).values
+    valid = coords.loc[valid_mask, ['pid', 'x', 'y']]
+    row_hashes = pd.util.hash_pandas_object(valid, index=False).values
+    codes, uniques = pd.factorize(row_hashes)
+    unique_positions = np.full(len(uniques), -1)
+    # Reversed assignment leaves the first occurrence of each code in place
+    unique_positions[codes[::-1]] = np.arange(len(codes))[::-1]
+    return valid_mask, codes, unique_positions
+
+def check_data_quality(coords, survey_df=None):
+    """Data-quality checks on the coordinates and survey mapping before clustering"""
+    pd = _import('pandas')
+    
+    valid_mask, codes, unique_positions = deduplicate_points(coords)
+    report = {
+        'Coordinate rows': len(coords),
+        'Rows with NaN coordinates (dropped)': int((~valid_mask).sum()),
+        'Duplicate (pid, x, y) rows': int(valid_mask.sum() - len(unique_positions)),
+        'Unique points clustered': len(unique_positions)
+    }
+    
+    if survey_df is not None:
+        survey_ids = survey_df['conversation_id']
+        coord_pids = coords['pid']
+        orphan_rows = ~coord_pids.isin(survey_ids)
+        report['Coordinate pids without survey rows'] = int(coord_pids[orphan_rows].nunique())
+        report['Coordinate rows without survey rows'] = int(orphan_rows.sum())
+        report['Survey conversations without coordinates'] = int(survey_ids[~survey_ids.isin(coord_pids)].nunique())
+        report['Duplicate survey rows'] = int(pd.util.hash_pandas_object(survey_df, index=False).duplicated().sum())
+    
+    return report, (valid_mask, codes, unique_positions)
+
+def save_data_quality_report(report, report_file=DATA_QUALITY_FILE):
+    """Print the data-quality report and save it as a text file"""
+    print("\nData quality:")
+    with open(report_file, 'w') as f:
+        f.write("CONSTRUCTS CLUSTER ANALYSIS - DATA QUALITY REPORT\n")
+        f.write("="*50 + "\n\n")
+        for check, value in report.items():
+            line = f"- {check}: {value:,}" if isinstance(value, int) else f"- {check}: {value}"
+            print(line)
+            f.write(line + "\n")
+    print(f"Saved data quality report: {report_file}\n")
+
+def canonical_cluster_labels(labels, coordinates):
+    """Renumber clusters deterministically: largest first, ties broken by centroid (x, y)
+    
+    Ward's raw label numbers depend on merge-tree internals; canonical numbering keeps
+    "Cluster 0" meaning the same thing across runs and library versions.
+    """
+    np = _import('numpy')
+    
+    clusters = np.unique(labels)
+    sizes = np.array([(labels == cluster).sum() for cluster in clusters])
+    centroids = np.array([coordinates[labels == cluster].mean(axis=0) for cluster in clusters])
+    order = np.lexsort((centroids[:, 1], centroids[:, 0], -sizes))
+    mapping = np.empty(clusters.max() + 1, dtype=int)
+    mapping[clusters[order]] = np.arange(len(clusters))
+    return mapping[labels]
+
+def canonical_sort(df):
+    """Sort rows by cluster, pid, coordinates and then every other column (stable)"""
+    leading = [col for col in ['cluster_7', 'pid', 'x', 'y'] if col in df.columns]
+    keys = leading + [col for col in df.columns if col not in leading]
+    return df.sort_values(keys, kind='stable', na_position='last').reset_index(drop=True)
+
+def load_and_recluster_data(coords_file=COORDINATES_FILE, survey_file=SURVEY_FILE,
+                            report_file=DATA_QUALITY_FILE):
     """Load original data and re-cluster to 7 groups"""
+    pd = _import('pandas')
+    AgglomerativeClustering = _import('sklearn.cluster').AgglomerativeClustering
     print("Loading original UMAP data...")
     
     # Load original coordinates with conversation_ids
-    original_coords = pd.read_csv("../umap_coordinates.csv")
+    original_coords = pd.read_csv(coords_file)
     print(f"Loaded original data: {len(original_coords)} records, {original_coords['agg_cluster'].nunique()} clusters")
     
-    # Extract coordinates for re-clustering
-    coordinates = original_coords[['x', 'y']].values
+    # Load survey mapping data
+    survey_df = None
+    if os.path.exists(survey_file):
+        survey_df = pd.read_csv(survey_file)
+        print(f"Loaded survey data: {len(survey_df)} records")
+    
+    # Validate and deduplicate before the O(n²) clustering step
+    quality_report, (valid_mask, codes, unique_positions) = check_data_quality(original_coords, survey_df)
+    original_coords = original_coords[valid_mask].reset_index(drop=True)
+    
+    # Extract unique coordinates for re-clustering
+    coordinates = original_coords[['x', 'y']].values[unique_positions]
     
     # Apply Agglomerative clustering to reduce to 7 clusters
-    print("Re-clustering to 7 groups...")
+    print(f"Re-clustering {len(coordinates)} unique points to 7 groups...")
     clustering = AgglomerativeClustering(n_clusters=7, linkage='ward')
-    new_clusters = clustering.fit_predict(coordinates)
+    new_clusters = canonical_cluster_labels(clustering.fit_predict(coordinates), coordinates)
     
-    # Add new cluster assignments
-    original_coords['cluster_7'] = new_clusters
+    # Add new cluster assignments (re-expanded to duplicate rows)
+    original_coords['cluster_7'] = new_clusters[codes]
     
-    # Load survey mapping data
-    survey_file = "pid to survey.csv"
-    if os.path.exists(survey_file):
-        survey_df = pd.read_csv(survey_file)
-        print(f"Loaded survey data: {len(survey_df)} records")
-        
+    if survey_df is not None:
         # Merge with survey data using conversation_id (pid)
         merged_df = original_coords.merge(
             survey_df, 
@@ -46,6 +177,9 @@ def load_and_recluster_data():
             how='left'
         )
         print(f"Merged data: {len(merged_df)} records")
+        quality_report['Merged rows'] = len(merged_df)
+        quality_report['Merged rows per coordinate row'] = round(len(merged_df) / max(len(original_coords), 1), 2)
+        save_data_quality_report(quality_report, report_file)
         
         # Add bipolar terms information
         if 'construct' in merged_df.columns and 'construct_bipolar' in merged_df.columns:
@@ -53,13 +187,16 @@ def load_and_recluster_data():
             merged_df['pole_a'] = merged_df['construct']
             merged_df['pole_b'] = merged_df['construct_bipolar']
         
-        return merged_df
+        return canonical_sort(merged_df)
     else:
         print("Survey data not found, using coordinates only")
-        return original_coords
+        save_data_quality_report(quality_report, report_file)
+        return canonical_sort(original_coords)
 
 def get_convex_hull_data(df, cluster_col='cluster_7'):
     """Calculate convex hull for each cluster"""
+    np = _import('numpy')
+    ConvexHull = _import('scipy.spatial').ConvexHull
     hull_data = []
     
     for cluster in sorted(df[cluster_col].unique()):
@@ -72,10 +209,11 @@ def get_convex_hull_data(df, cluster_col='cluster_7'):
                 # Close the polygon
                 hull_points = np.vstack([hull_points, hull_points[0]])
                 
+                # Kept as numpy arrays so plotly stores them as base64 typed arrays
                 hull_data.append({
                     'cluster': cluster,
-                    'hull_x': hull_points[:, 0].tolist(),
-                    'hull_y': hull_points[:, 1].tolist()
+                    'hull_x': hull_points[:, 0],
+                    'hull_y': hull_points[:, 1]
                 })
             except Exception as e:
                 print(f"Cannot calculate convex hull for cluster {cluster}: {e}")
@@ -84,6 +222,10 @@ def get_convex_hull_data(df, cluster_col='cluster_7'):
 
 def create_interactive_plot_with_surveys(df):
     """Create interactive visualization with flexible survey filtering"""
+    pd = _import('pandas')
+    go = _import('plotly.graph_objects')
+    # plotly.colors provides the same palettes as plotly.express without its import cost
+    qualitative = _import('plotly.colors').qualitative
     print("Creating interactive visualization...")
     
     # Get unique surveys if available
@@ -94,13 +236,13 @@ def create_interactive_plot_with_surveys(df):
     
     # Get cluster colors
     clusters = sorted(df['cluster_7'].unique())
-    colors = px.colors.qualitative.Set3
+    colors = qualitative.Set3
     if len(clusters) > len(colors):
         colors = colors * ((len(clusters) // len(colors)) + 1)
     color_map = dict(zip(clusters, colors[:len(clusters)]))
     
     # Survey colors for highlighting
-    survey_colors = px.colors.qualitative.Pastel
+    survey_colors = qualitative.Pastel
     if len(surveys) > len(survey_colors):
         survey_colors = survey_colors * ((len(surveys) // len(survey_colors)) + 1)
     survey_color_map = dict(zip(surveys, survey_colors[:len(surveys)]))
@@ -261,23 +403,8 @@ def create_interactive_plot_with_surveys(df):
                 'args': [{'visible': toggle_visibility}]
             })
         
-        # Add survey combination buttons
-        buttons.append({'label': '--- Survey Combinations ---', 'method': 'skip', 'args': []})
-        
-        # Show multiple surveys at once
-        for i in range(len(surveys)):
-            for j in range(i+1, len(surveys)):
-                combo_visibility = [False] * (len(hull_data) + len(clusters))
-                survey_visibility = [False] * len(surveys)
-                survey_visibility[i] = True
-                survey_visibility[j] = True
-                combo_visibility.extend(survey_visibility)
-                
-                buttons.append({
-                    'label': f'🔍 {surveys[i]} + {surveys[j]}',
-                    'method': 'restyle',
-                    'args': [{'visible': combo_visibility}]
-                })
+        # Pairwise survey comparison lives in survey_comparison_heatmap.html
+        # (one enrichment/overlap heatmap instead of O(S²) combination buttons)
         
         # Show all surveys
         buttons.append({
@@ -388,8 +515,11 @@ def create_download_dataset(df):
         clean_df['Cluster_Size'] = clean_df['Cluster'].map(cluster_sizes)
     
     # Sort by cluster and coordinates for better organization
+    # (remaining columns break ties so the row order is fully deterministic)
     if 'Cluster' in clean_df.columns and 'Coordinate_X' in clean_df.columns:
-        clean_df = clean_df.sort_values(['Cluster', 'Coordinate_X', 'Coordinate_Y'])
+        leading = ['Cluster', 'Coordinate_X', 'Coordinate_Y']
+        keys = leading + [col for col in clean_df.columns if col not in leading]
+        clean_df = clean_df.sort_values(keys, kind='stable', na_position='last')
     
     # Reset index for clean numbering
     clean_df = clean_df.reset_index(drop=True)
@@ -398,13 +528,30 @@ def create_download_dataset(df):
     
     return clean_df
 
-def save_final_version_files(df, output_dir):
+def save_visualization(fig, html_file, html_options=None, bundle_dir=None):
+    """Write the interactive visualization HTML using the selected output options
+    
+    html_options: dict with 'mode' (standalone/shared/cdn), 'compress' (gzip/brotli)
+    and 'report' (print the size comparison). Defaults to a standalone file.
+    """
+    import html_export
+    options = html_options or {}
+    written = html_export.write_html(
+        fig, html_file,
+        mode=options.get('mode', 'standalone'),
+        bundle_dir=bundle_dir,
+        compress=options.get('compress') or ()
+    )
+    if options.get('report'):
+        html_export.print_size_report(html_file, html_export.size_report(fig, written))
+    return written
+
+def save_final_version_files(df, output_dir, include_visualization=True, html_options=None,
+                             include_comparison=True):
     """Save all final version files to the specified directory"""
+    pd = _import('pandas')
     print(f"Saving final version files to: {output_dir}")
     
-    import os
-    import shutil
-    
     # Ensure output directory exists
     os.makedirs(output_dir, exist_ok=True)
     
@@ -415,10 +562,11 @@ def save_final_version_files(df, output_dir):
     print(f"✅ Saved download dataset: {download_file}")
     
     # 2. Save the interactive visualization
-    fig = create_interactive_plot_with_surveys(df)
-    viz_file = os.path.join(output_dir, "interactive_constructs_cluster_visualization.html")
-    fig.write_html(viz_file)
-    print(f"✅ Saved interactive visualization: {viz_file}")
+    if include_visualization:
+        fig = create_interactive_plot_with_surveys(df)
+        viz_file = os.path.join(output_dir, "interactive_constructs_cluster_visualization.html")
+        save_visualization(fig, viz_file, html_options, bundle_dir=output_dir)
+        print(f"✅ Saved interactive visualization: {viz_file}")
     
     # 3. Create and save statistics
     cluster_stats, survey_stats = create_statistics(df)
@@ -432,6 +580,10 @@ def save_final_version_files(df, output_dir):
         survey_stats.to_csv(survey_stats_file, index=False)
         print(f"✅ Saved survey statistics: {survey_stats_file}")
     
+    # 3b. Cross-survey comparison matrices and heatmap
+    if survey_stats is not None and include_comparison:
+        save_survey_comparison_files(df, output_dir, include_visualization, html_options)
+    
     # 4. Save the complete processed dataset
     complete_file = os.path.join(output_dir, "complete_processed_dataset.csv")
     df.to_csv(complete_file, index=False)
@@ -442,7 +594,9 @@ def save_final_version_files(df, output_dir):
     with open(summary_file, 'w') as f:
         f.write("CONSTRUCTS CLUSTER ANALYSIS - DATASET SUMMARY\n")
         f.write("="*50 + "\n\n")
-        f.write(f"Generated on: {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+        # Content fingerprint instead of a timestamp so unchanged data gives an identical file
+        import output_manifest
+        f.write(f"Data version: {output_manifest.file_sha256(complete_file)[:16]}\n\n")
         
         f.write("DATASET OVERVIEW:\n")
         f.write(f"- Total data points: {len(df):,}\n")
@@ -464,20 +618,42 @@ def save_final_version_files(df, output_dir):
                 survey_data = df[df['survey_name'] == survey]
                 f.write(f"- {survey}: {len(survey_data):,} points from {survey_data['pid'].nunique()} conversations\n")
         
+        # Only files present in the folder are listed, so the summary is the same
+        # whichever subcommand (full run, export, ...) last wrote it
         f.write("\nFILES INCLUDED:\n")
-        f.write("- constructs_cluster_dataset.csv: Clean dataset for analysis\n")
-        f.write("- interactive_constructs_cluster_visualization.html: Interactive visualization\n")
-        f.write("- cluster_analysis_statistics.csv: Cluster statistics\n")
-        f.write("- survey_analysis_statistics.csv: Survey statistics\n")
-        f.write("- complete_processed_dataset.csv: Full processed dataset\n")
-        f.write("- README.md: Documentation and usage guide\n")
+        for file_name, description in SUMMARY_FILES:
+            if os.path.exists(os.path.join(output_dir, file_name)):
+                f.write(f"- {file_name}: {description}\n")
     
     print(f"✅ Saved summary report: {summary_file}")
     
     return download_df, download_file
 
+def save_survey_comparison_files(df, output_dir, include_visualization=True, html_options=None):
+    """Compute and save the cross-survey comparison matrices (and heatmap)"""
+    import survey_comparison
+    # Loaded through _import so the import report includes them
+    _import('scipy.sparse')
+    if include_visualization:
+        _import('plotly.graph_objects')
+        _import('plotly.subplots')
+    comparison = survey_comparison.compute_survey_comparison(df)
+    for path in survey_comparison.save_survey_comparison(comparison, output_dir):
+        print(f"✅ Saved survey comparison: {path}")
+    print(f"   Chi-square on {comparison['test_points']:,} unique points: {comparison['chi_square']:.2f} (dof {comparison['dof']}, "
+          f"p = {comparison['p_value']:.3g}), Cramér's V {comparison['cramers_v']:.3f}")
+    
+    if include_visualization:
+        fig = survey_comparison.create_comparison_figure(comparison)
+        heatmap_file = os.path.join(output_dir, survey_comparison.HEATMAP_FILE)
+        save_visualization(fig, heatmap_file, html_options, bundle_dir=output_dir)
+        print(f"✅ Saved survey comparison heatmap: {heatmap_file}")
+    
+    return comparison
+
 def create_statistics(df):
     """Create comprehensive statistics"""
+    pd = _import('pandas')
     print("Generating statistics...")
     
     # Cluster statistics
@@ -539,7 +715,7 @@ def create_statistics(df):
     
     return cluster_df, survey_stats
 
-def main():
+def main(html_options=None):
     """Main function"""
     print("=== UMAP Re-clustering to 7 Groups with Survey Integration ===")
     
@@ -547,7 +723,7 @@ def main():
     df = load_and_recluster_data()
     
     # Save the re-clustered data (original location)
-    reclustered_file = "umap_coordinates_7clusters_with_surveys.csv"
+    reclustered_file = RECLUSTERED_FILE
     df.to_csv(reclustered_file, index=False)
     print(f"Saved re-clustered data: {reclustered_file}")
     
@@ -561,15 +737,23 @@ def main():
         print(f"- Surveys: {df['survey_name'].dropna().nunique()}")
     
     # Define final version output directory
-    final_output_dir = "../final version of constructs cluster"
+    final_output_dir = FINAL_OUTPUT_DIR
     
     # Save all final version files
-    download_df, download_file = save_final_version_files(df, final_output_dir)
+    download_df, download_file = save_final_version_files(df, final_output_dir, html_options=html_options)
+    
+    # Build the nearest-neighbour index and per-cluster representatives
+    import cluster_index
+    cluster_index.build_and_save(df, final_output_dir)
+    
+    # Record content hashes of everything in the final version folder
+    import output_manifest
+    output_manifest.update_manifest(final_output_dir)
     
     # Also save to current directory for backward compatibility
     fig = create_interactive_plot_with_surveys(df)
     output_file = "umap_7clusters_with_surveys.html"
-    fig.write_html(output_file)
+    save_visualization(fig, output_file, html_options, bundle_dir=final_output_dir)
     print(f"\nBackward compatibility: Interactive visualization saved: {output_file}")
     
     # Generate statistics for current directory
@@ -612,5 +796,239 @@ def main():
     print(f"3. Statistical analysis: Check the statistics CSV files")
     print(f"4. Documentation: Read the README.md file in the final version folder")
 
+def load_reclustered_data(reclustered_file=RECLUSTERED_FILE):
+    """Load the re-clustered dataset written by the cluster step"""
+    pd = _import('pandas')
+    if not os.path.exists(reclustered_file):
+        raise FileNotFoundError(
+            f"{reclustered_file} not found - run the 'cluster' subcommand first"
+        )
+    df = pd.read_csv(reclustered_file)
+    print(f"Loaded re-clustered data: {len(df)} records")
+    return df
+
+def run_cluster(args):
+    """Re-cluster the UMAP coordinates and save the merged dataset"""
+    df = load_and_recluster_data(args.coords, args.survey)
+    df.to_csv(RECLUSTERED_FILE, index=False)
+    print(f"Saved re-clustered data: {RECLUSTERED_FILE}")
+    return 0
+
+def run_stats(args):
+    """Recompute the statistics CSVs from the re-clustered dataset"""
+    df = load_reclustered_data()
+    cluster_stats, survey_stats = create_statistics(df)
+    cluster_stats.to_csv("cluster_statistics_7_integrated.csv", index=False)
+    print(f"Saved cluster statistics: cluster_statistics_7_integrated.csv")
+    if survey_stats is not None:
+        survey_stats.to_csv("survey_statistics_7_integrated.csv", index=False)
+        print(f"Saved survey statistics: survey_statistics_7_integrated.csv")
+    return 0
+
+def run_export(args):
+    """Write the download dataset, statistics and summary without plotting"""
+    df = load_reclustered_data()
+    save_final_version_files(df, args.output_dir, include_visualization=False,
+                             include_comparison=args.compare)
+    import output_manifest
+    output_manifest.update_manifest(args.output_dir)
+    return 0
+
+def run_plot(args):
+    """Write the interactive visualization HTML files"""
+    df = load_reclustered_data()
+    fig = create_interactive_plot_with_surveys(df)
+    os.makedirs(args.output_dir, exist_ok=True)
+    viz_file = os.path.join(args.output_dir, "interactive_constructs_cluster_visualization.html")
+    save_visualization(fig, viz_file, html_options(args), bundle_dir=args.output_dir)
+    print(f"✅ Saved interactive visualization: {viz_file}")
+    save_visualization(fig, "umap_7clusters_with_surveys.html", html_options(args), bundle_dir=args.output_dir)
+    print(f"Backward compatibility: Interactive visualization saved: umap_7clusters_with_surveys.html")
+    import output_manifest
+    output_manifest.update_manifest(args.output_dir)
+    return 0
+
+def run_windows(args):
+    """Update survey-time partitions and write time-sliced statistics"""
+    import windowed_analysis
+    df = load_reclustered_data()
+    windowed_analysis.run_windowed_analysis(df, args.freq, args.partition_dir)
+    return 0
+
+def run_index(args):
+    """Build the nearest-neighbour index and per-cluster representatives"""
+    import cluster_index
+    df = load_reclustered_data()
+    # Loaded through _import so the import report includes it
+    _import('scipy.spatial')
+    cluster_index.build_and_save(df, args.output_dir, args.top_k)
+    import output_manifest
+    output_manifest.update_manifest(args.output_dir)
+    return 0
+
+def run_nearest(args):
+    """Print the constructs nearest to a conversation or a coordinate"""
+    import cluster_index
+    _import('pandas')
+    _import('scipy.spatial')
+    return cluster_index.print_nearest(os.path.join(args.output_dir, cluster_index.INDEX_FILE),
+                                       args.pid, args.xy, args.k)
+
+def run_compare(args):
+    """Write the cross-survey comparison matrices and heatmap"""
+    df = load_reclustered_data()
+    if 'survey_name' not in df.columns:
+        print("Survey data not found, nothing to compare")
+        return 1
+    save_survey_comparison_files(df, args.output_dir, not args.no_heatmap, html_options(args))
+    import output_manifest
+    output_manifest.update_manifest(args.output_dir)
+    return 0
+
+def run_publish(args):
+    """Publish only the artifacts whose content changed since the last publish"""
+    import output_manifest
+    files = output_manifest.deployment_files(args.config, args.output_dir) if args.config else None
+    output_manifest.publish(args.output_dir, args.target, files, args.dry_run)
+    return 0
+
+def run_shards(args):
+    """Run the pipeline for many corpora in parallel (options are passed through)"""
+    import sharded_runner
+    return sharded_runner.main(args.options)
+
+def run_validate(args):
+    """Run the environment validation script (extra options are passed through)"""
+    import validate_environment
+    return validate_environment.main(args.options)
+
+def run_all(args):
+    """Run the full pipeline (default when no subcommand is given)"""
+    main(html_options(args))
+    return 0
+
+def html_options(args):
+    """HTML output options from the command line arguments"""
+    return {'mode': args.html_mode, 'compress': args.compress, 'report': args.html_report}
+
+def positive_int(text):
+    """argparse type for options that must be at least 1"""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(
+        description="Re-cluster UMAP coordinates to 7 groups with survey integration"
+    )
+    parser.add_argument('--import-report', action='store_true',
+                        help="print the time spent importing heavy dependencies")
+    parser.add_argument('--html-mode', choices=['standalone', 'shared', 'cdn'], default='standalone',
+                        help="embed plotly.js in every HTML file (standalone), reference one "
+                             "shared plotly.min.js in the output directory (shared) or the CDN")
+    parser.add_argument('--compress', action='append', choices=['gzip', 'brotli'], default=[],
+                        help="also write pre-compressed .gz/.br copies of the HTML (repeatable)")
+    parser.add_argument('--html-report', action='store_true',
+                        help="compare HTML sizes and estimated load times with standalone output")
+    parser.set_defaults(func=run_all)
+    subparsers = parser.add_subparsers(dest='command')
+
+    cluster_parser = subparsers.add_parser('cluster', help="re-cluster and merge survey data")
+    cluster_parser.add_argument('--coords', default=COORDINATES_FILE,
+                                help="UMAP coordinates CSV")
+    cluster_parser.add_argument('--survey', default=SURVEY_FILE,
+                                help="pid to survey mapping CSV")
+    cluster_parser.set_defaults(func=run_cluster)
+
+    stats_parser = subparsers.add_parser('stats', help="recompute statistics (pandas only)")
+    stats_parser.set_defaults(func=run_stats)
+
+    for name, func, help_text in [
+        ('export', run_export, "write download dataset, statistics and summary (pandas only)"),
+        ('plot', run_plot, "write interactive visualization (plotly, scipy)"),
+    ]:
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument('--output-dir', default=FINAL_OUTPUT_DIR,
+                         help="final version output directory")
+        sub.set_defaults(func=func)
+        if name == 'export':
+            sub.add_argument('--compare', action='store_true',
+                             help="also write the survey comparison matrices (adds scipy.sparse)")
+
+    windows_parser = subparsers.add_parser(
+        'windows', help="incremental per-period statistics by survey end time (pandas only)"
+    )
+    windows_parser.add_argument('--freq', choices=['daily', 'weekly'], default='weekly',
+                                help="partition granularity")
+    windows_parser.add_argument('--partition-dir', default="partitions",
+                                help="directory holding the partial aggregates")
+    windows_parser.set_defaults(func=run_windows)
+
+    compare_parser = subparsers.add_parser(
+        'compare', help="survey x cluster contingency, enrichment and overlap matrices (pandas, scipy.sparse, plotly)"
+    )
+    compare_parser.add_argument('--output-dir', default=FINAL_OUTPUT_DIR,
+                                help="final version output directory")
+    compare_parser.add_argument('--no-heatmap', action='store_true',
+                                help="only write the CSV matrices (skips plotly)")
+    compare_parser.set_defaults(func=run_compare)
+
+    index_parser = subparsers.add_parser(
+        'index', help="build the nearest-neighbour index and cluster representatives (scipy)"
+    )
+    index_parser.add_argument('--output-dir', default=FINAL_OUTPUT_DIR,
+                              help="final version output directory")
+    index_parser.add_argument('--top-k', type=positive_int, default=5,
+                              help="central and boundary points reported per cluster")
+    index_parser.set_defaults(func=run_index)
+
+    nearest_parser = subparsers.add_parser('nearest', help="query the nearest-neighbour index")
+    nearest_parser.add_argument('--output-dir', default=FINAL_OUTPUT_DIR,
+                                help="directory containing cluster_index.pkl")
+    nearest_parser.add_argument('--k', type=positive_int, default=10, help="number of neighbours")
+    nearest_target = nearest_parser.add_mutually_exclusive_group(required=True)
+    nearest_target.add_argument('--pid', help="conversation ID to find neighbours for")
+    nearest_target.add_argument('--xy', nargs=2, type=float, metavar=('X', 'Y'),
+                                help="UMAP coordinates")
+    nearest_parser.set_defaults(func=run_nearest)
+
+    publish_parser = subparsers.add_parser(
+        'publish', help="copy only changed artifacts to a deployment directory"
+    )
+    publish_parser.add_argument('target', help="deployment directory")
+    publish_parser.add_argument('--output-dir', default=FINAL_OUTPUT_DIR,
+                                help="final version output directory to publish from")
+    publish_parser.add_argument('--config',
+                                help="only publish deployment.files from this config (e.g. v0-config.json)")
+    publish_parser.add_argument('--dry-run', action='store_true',
+                                help="list what would be published")
+    publish_parser.set_defaults(func=run_publish)
+
+    shards_parser = subparsers.add_parser(
+        'shards', help="process a manifest of corpora in parallel (accepts sharded_runner.py options)"
+    )
+    shards_parser.set_defaults(func=run_shards)
+
+    validate_parser = subparsers.add_parser(
+        'validate', help="validate the environment (accepts validate_environment.py options)"
+    )
+    validate_parser.set_defaults(func=run_validate)
+
+    args, extra = parser.parse_known_args(argv)
+    if extra and args.command not in ('validate', 'shards'):
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    args.options = extra
+    return args
+
+def cli(argv=None):
+    """Command line entry point"""
+    args = parse_args(argv)
+    exit_code = args.func(args)
+    if args.import_report:
+        print_import_report()
+    return exit_code
+
 if __name__ == "__main__":
-    main()
+    sys.exit(cli())
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compact HTML Export
+Write plotly figures that reference one shared plotly.js bundle instead of
+embedding it, optionally pre-compressed with gzip/brotli for static hosting
+"""
+
+import functools
+import gzip
+import os
+from urllib.parse import quote
+
+PLOTLYJS_FILE = "plotly.min.js"
+HTML_MODES = ('standalone', 'shared', 'cdn')
+COMPRESSIONS = ('gzip', 'brotli')
+COMPRESSED_SUFFIXES = {'gzip': '.gz', 'brotli': '.br'}
+
+# Nominal bandwidth used to estimate transfer time in the size report
+REPORT_BANDWIDTH_MBIT = 10
+
+@functools.lru_cache(maxsize=None)
+def _brotli_available():
+    """Whether the optional brotli package is installed (warns once if not)"""
+    try:
+        import brotli
+        return True
+    except ImportError:
+        print("⚠️  brotli not installed, skipping .br output (pip install brotli)")
+        return False
+
+def write_shared_plotlyjs(bundle_dir):
+    """Write the plotly.js bundle once into bundle_dir and return its path"""
+    import plotly
+    from plotly.offline import get_plotlyjs
+
+    os.makedirs(bundle_dir, exist_ok=True)
+    bundle_file = os.path.join(bundle_dir, PLOTLYJS_FILE)
+    # Rewrite only when the installed plotly version changes
+    version_file = bundle_file + ".version"
+    if os.path.exists(bundle_file) and os.path.exists(version_file):
+        with open(version_file) as f:
+            if f.read().strip() == plotly.__version__:
+                return bundle_file
+
+    with open(bundle_file, 'w', encoding='utf-8') as f:
+        f.write(get_plotlyjs())
+    with open(version_file, 'w') as f:
+        f.write(plotly.__version__)
+    return bundle_file
+
+def compress_file(path, methods):
+    """Write pre-compressed copies (path.gz / path.br) next to path"""
+    written = {}
+    if not methods:
+        return written
+
+    with open(path, 'rb') as f:
+        content = f.read()
+
+    if 'gzip' in methods:
+        # mtime=0 keeps the .gz output identical for identical input
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzip.compress(content, compresslevel=9, mtime=0))
+        written['gzip'] = path + '.gz'
+
+    if 'brotli' in methods and _brotli_available():
+        import brotli
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(content, quality=11))
+        written['brotli'] = path + '.br'
+
+    return written
+
+def remove_stale_compressed(path, written):
+    """Delete .gz/.br copies of path that were not rewritten from its current content
+
+    A copy left from an earlier run with other options would otherwise be
+    served by static hosts in place of the new file.
+    """
+    for method, suffix in COMPRESSED_SUFFIXES.items():
+        if method not in written and os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+def bundle_files(directory):
+    """Paths of the shared bundle and its bookkeeping/compressed copies in directory"""
+    bundle_file = os.path.join(directory, PLOTLYJS_FILE)
+    return [bundle_file, bundle_file + ".version"] + [bundle_file + suffix for suffix in COMPRESSED_SUFFIXES.values()]
+
+def bundle_referenced(directory):
+    """Whether any HTML file in directory loads the shared bundle next to it"""
+    marker = f'src="{PLOTLYJS_FILE}"'.encode('utf-8')
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.html'):
+            with open(os.path.join(directory, name), 'rb') as f:
+                if marker in f.read():
+                    return True
+    return False
+
+def write_html(fig, html_file, mode='standalone', bundle_dir=None, compress=()):
+    """Write a figure as HTML
+
+    mode='standalone' embeds plotly.js (the default plotly behaviour),
+    mode='shared' references plotly.min.js in bundle_dir (defaults to the HTML's
+    directory) via a relative path, and mode='cdn' references the plotly CDN.
+    Returns the paths of the bundle and compressed copies that were written.
+    """
+    if mode not in HTML_MODES:
+        raise ValueError(f"Unknown HTML mode '{mode}', expected one of {HTML_MODES}")
+
+    html_dir = os.path.dirname(os.path.abspath(html_file))
+    written = {'html': html_file}
+
+    if mode == 'standalone':
+        include_plotlyjs = True
+    elif mode == 'cdn':
+        include_plotlyjs = 'cdn'
+    else:
+        bundle_file = write_shared_plotlyjs(bundle_dir or html_dir)
+        written['bundle'] = bundle_file
+        relative = os.path.relpath(os.path.abspath(bundle_file), html_dir)
+        include_plotlyjs = quote(relative.replace(os.sep, '/'))
+
+    # A fixed div id (plotly otherwise generates a random one) keeps the HTML reproducible
+    div_id = os.path.splitext(os.path.basename(html_file))[0]
+    fig.write_html(html_file, include_plotlyjs=include_plotlyjs, div_id=div_id)
+
+    compressed = compress_file(html_file, compress)
+    remove_stale_compressed(html_file, compressed)
+    written.update(compressed)
+    if 'bundle' in written:
+        written.update(_compress_bundle(written['bundle'], compress))
+
+    return written
+
+def _compress_bundle(bundle_file, methods):
+    """Compress the shared bundle unless up-to-date compressed copies exist"""
+    bundle_mtime = os.path.getmtime(bundle_file)
+    current, stale = {}, []
+    for method in methods:
+        path = bundle_file + COMPRESSED_SUFFIXES[method]
+        if os.path.exists(path) and os.path.getmtime(path) >= bundle_mtime:
+            current[method] = path
+        else:
+            stale.append(method)
+    current.update(compress_file(bundle_file, stale))
+    remove_stale_compressed(bundle_file, current)
+    return {f'bundle_{method}': path for method, path in current.items()}
+
+def _size(path):
+    return os.path.getsize(path) if path and os.path.exists(path) else 0
+
+def _transfer_seconds(n_bytes):
+    return n_bytes * 8 / (REPORT_BANDWIDTH_MBIT * 1_000_000)
+
+def size_report(fig, written):
+    """Compare the written files with the standalone HTML plotly would produce
+
+    The standalone size is measured by rendering the figure with plotly.js
+    embedded. Load times are transfer-time estimates at REPORT_BANDWIDTH_MBIT;
+    browser parse time is not included.
+    """
+    standalone_bytes = len(fig.to_html(include_plotlyjs=True).encode('utf-8'))
+    html_bytes = _size(written['html'])
+    bundle_bytes = _size(written.get('bundle'))
+
+    best_method = next((m for m in ('brotli', 'gzip') if m in written), None)
+    if best_method:
+        html_wire = _size(written[best_method])
+        bundle_wire = _size(written.get(f'bundle_{best_method}')) if bundle_bytes else 0
+    else:
+        html_wire, bundle_wire = html_bytes, bundle_bytes
+
+    return {
+        'standalone_bytes': standalone_bytes,
+        'html_bytes': html_bytes,
+        'bundle_bytes': bundle_bytes,
+        'transfer_encoding': best_method or 'identity',
+        'first_load_bytes': html_wire + bundle_wire,
+        'cached_load_bytes': html_wire,
+        'standalone_load_s': _transfer_seconds(standalone_bytes),
+        'first_load_s': _transfer_seconds(html_wire + bundle_wire),
+        'cached_load_s': _transfer_seconds(html_wire)
+    }
+
+def print_size_report(html_file, report):
+    """Print a size_report() result"""
+    mb = 1024 ** 2
+    reduction = 1 - report['first_load_bytes'] / report['standalone_bytes']
+    cached_reduction = 1 - report['cached_load_bytes'] / report['standalone_bytes']
+    print(f"\n=== HTML SIZE REPORT: {html_file} ===")
+    print(f"- Standalone HTML (current): {report['standalone_bytes'] / mb:.2f} MB")
+    if report['bundle_bytes']:
+        print(f"- Compact HTML: {report['html_bytes'] / mb:.2f} MB"
+              f" + shared plotly.js {report['bundle_bytes'] / mb:.2f} MB")
+    else:
+        print(f"- Compact HTML: {report['html_bytes'] / mb:.2f} MB (plotly.js from CDN, not counted)")
+    print(f"- Transferred ({report['transfer_encoding']}): first load {report['first_load_bytes'] / mb:.2f} MB"
+          f" ({reduction:.0%} smaller), with cached plotly.js {report['cached_load_bytes'] / mb:.2f} MB"
+          f" ({cached_reduction:.0%} smaller)")
+    print(f"- Estimated transfer time at {REPORT_BANDWIDTH_MBIT} Mbit/s: "
+          f"{report['standalone_load_s']:.1f}s -> {report['first_load_s']:.1f}s first load, "
+          f"{report['cached_load_s']:.1f}s cached")
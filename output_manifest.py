@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Output Manifest and Incremental Publishing
+Record content hashes of the generated artifacts and publish only the files
+whose content changed since the last publish
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+MANIFEST_FILE = "manifest.json"
+PUBLISHED_MANIFEST_FILE = "published_manifest.json"
+
+# Bookkeeping files that are not artifacts themselves
+EXCLUDED_SUFFIXES = ('.version',)
+EXCLUDED_FILES = (MANIFEST_FILE, PUBLISHED_MANIFEST_FILE)
+
+def file_sha256(path, chunk_size=1 << 20):
+    """SHA-256 of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _artifact_files(output_dir):
+    """Relative paths of all artifacts under output_dir, in sorted order
+
+    The shared plotly.js bundle is left out when no HTML file next to it loads
+    it (e.g. after switching back to standalone HTML), and so are .gz/.br copies
+    older than the file they were compressed from.
+    """
+    import html_export
+
+    excluded = set()
+    if os.path.isdir(output_dir) and not html_export.bundle_referenced(output_dir):
+        excluded = {os.path.basename(path) for path in html_export.bundle_files(output_dir)}
+
+    files = []
+    for root, dirs, names in os.walk(output_dir):
+        dirs.sort()
+        for name in sorted(names):
+            if name in EXCLUDED_FILES or name.endswith(EXCLUDED_SUFFIXES):
+                continue
+            if root == output_dir and name in excluded:
+                continue
+            path = os.path.join(root, name)
+            if _stale_compressed_copy(path):
+                continue
+            files.append(os.path.relpath(path, output_dir).replace(os.sep, '/'))
+    return files
+
+def _manifest_entry(path):
+    return {'sha256': file_sha256(path), 'bytes': os.path.getsize(path)}
+
+def _stale_compressed_copy(path):
+    """Whether path is a .gz/.br copy older than the file it was compressed from"""
+    source, suffix = os.path.splitext(path)
+    return (suffix in ('.gz', '.br') and os.path.exists(source)
+            and os.path.getmtime(path) < os.path.getmtime(source))
+
+def build_manifest(output_dir):
+    """Map each artifact (relative path) to its sha256 and size"""
+    return {relative: _manifest_entry(os.path.join(output_dir, relative))
+            for relative in _artifact_files(output_dir)}
+
+def load_manifest(manifest_file):
+    """Load a manifest written by save_manifest ({} if missing)"""
+    if not os.path.exists(manifest_file):
+        return {}
+    with open(manifest_file, encoding='utf-8') as f:
+        return json.load(f)['artifacts']
+
+def save_manifest(manifest, manifest_file):
+    """Write a manifest as canonical (sorted, indented) JSON"""
+    with open(manifest_file, 'w', encoding='utf-8') as f:
+        json.dump({'artifacts': manifest}, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+def diff_manifests(old, new):
+    """Return (added, changed, removed, unchanged) artifact lists"""
+    added = sorted(name for name in new if name not in old)
+    removed = sorted(name for name in old if name not in new)
+    changed = sorted(name for name in new if name in old and new[name]['sha256'] != old[name]['sha256'])
+    unchanged = sorted(name for name in new if name in old and new[name]['sha256'] == old[name]['sha256'])
+    return added, changed, removed, unchanged
+
+def update_manifest(output_dir):
+    """Rewrite output_dir/manifest.json and report what changed since the previous one"""
+    manifest_file = os.path.join(output_dir, MANIFEST_FILE)
+    previous = load_manifest(manifest_file)
+    current = build_manifest(output_dir)
+    save_manifest(current, manifest_file)
+
+    added, changed, removed, unchanged = diff_manifests(previous, current)
+    print(f"✅ Saved manifest ({len(current)} artifacts): {manifest_file}")
+    print(f"   {len(added)} added, {len(changed)} changed, {len(removed)} removed, {len(unchanged)} unchanged")
+    for name in added + changed:
+        print(f"   * {name}")
+    return current
+
+def deployment_files(config_file, source_dir):
+    """Resolve the files listed for deployment in a v0-config.json style config
+
+    Each entry is looked up in source_dir (the generated artifacts) first and then
+    in the config's own directory, where hand-written files such as index.html
+    live. Returns {name: path}; raises FileNotFoundError if a listed file is in
+    neither.
+    """
+    with open(config_file, encoding='utf-8') as f:
+        config = json.load(f)
+    config_dir = os.path.dirname(os.path.abspath(config_file))
+
+    files, missing = {}, []
+    for name in config.get('deployment', {}).get('files', []):
+        candidates = [os.path.join(source_dir, name), os.path.join(config_dir, name)]
+        path = next((candidate for candidate in candidates if os.path.isfile(candidate)), None)
+        if path is None:
+            missing.append(name)
+        else:
+            files[name] = path
+    if missing:
+        raise FileNotFoundError(
+            f"Deployment files listed in {config_file} not found in {source_dir} "
+            f"or {config_dir}: {', '.join(missing)}"
+        )
+    return files
+
+def publish(source_dir, target_dir, files=None, dry_run=False):
+    """Copy only new or changed artifacts to target_dir
+
+    files maps artifact names to source paths (see deployment_files); by default
+    every artifact in source_dir is published. The target keeps
+    published_manifest.json with the hashes of what it holds, so unchanged
+    artifacts are never re-uploaded.
+    """
+    selection = files is not None
+    if not selection:
+        files = {name: os.path.join(source_dir, name) for name in _artifact_files(source_dir)}
+    current = {name: _manifest_entry(path) for name, path in sorted(files.items())}
+
+    published_file = os.path.join(target_dir, PUBLISHED_MANIFEST_FILE)
+    published = load_manifest(published_file)
+    if selection:
+        published = {name: entry for name, entry in published.items() if name in files}
+    added, changed, removed, unchanged = diff_manifests(published, current)
+
+    to_copy = added + changed
+    copy_bytes = sum(current[name]['bytes'] for name in to_copy)
+    total_bytes = sum(entry['bytes'] for entry in current.values())
+    print(f"Publishing {source_dir} -> {target_dir}{' (dry run)' if dry_run else ''}")
+    print(f"- {len(to_copy)} to upload ({copy_bytes:,} of {total_bytes:,} bytes), "
+          f"{len(unchanged)} unchanged, {len(removed)} no longer generated")
+    for name in to_copy:
+        source = files[name]
+        origin = '' if os.path.abspath(source) == os.path.abspath(os.path.join(source_dir, name)) else f" (from {source})"
+        print(f"  {'+' if name in added else '*'} {name}{origin}")
+    for name in removed:
+        print(f"  - {name} (left in place)")
+
+    if dry_run:
+        return to_copy
+
+    for name in to_copy:
+        destination = os.path.join(target_dir, name)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        shutil.copy2(files[name], destination)
+
+    # Keep entries for files published outside this selection
+    full_published = load_manifest(published_file)
+    full_published.update(current)
+    os.makedirs(target_dir, exist_ok=True)
+    save_manifest(full_published, published_file)
+    print(f"✅ Published {len(to_copy)} artifacts")
+    return to_copy
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Publish only changed analysis artifacts")
+    parser.add_argument('source_dir', help="directory with the generated artifacts")
+    parser.add_argument('target_dir', help="deployment directory to publish into")
+    parser.add_argument('--config', help="only publish deployment.files from this config (e.g. v0-config.json)")
+    parser.add_argument('--dry-run', action='store_true', help="list what would be published")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Main function"""
+    args = parse_args(argv)
+    files = deployment_files(args.config, args.source_dir) if args.config else None
+    publish(args.source_dir, args.target_dir, files, args.dry_run)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sharded Multi-Corpus Runner
+Run load -> cluster -> stats -> export for many conversation corpora in
+parallel (one fresh worker process per corpus) with per-worker memory caps and
+retries, then merge the per-corpus statistics into a combined summary
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+COMBINED_OUTPUT_DIR = "combined corpora"
+DEFAULT_RETRIES = 2
+
+# Native thread pools are pinned to one thread per worker so that N workers use
+# N cores instead of oversubscribing the machine
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+                   'VECLIB_MAXIMUM_THREADS', 'NUMEXPR_NUM_THREADS')
+
+def load_corpora(manifest_file):
+    """Load the corpus manifest
+
+    Expected JSON: {"corpora": [{"name": ..., "coords": ..., "survey": ...,
+    "output_dir": optional}, ...]}. Relative paths are resolved against the
+    manifest's directory.
+    """
+    with open(manifest_file, encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    base_dir = os.path.dirname(os.path.abspath(manifest_file))
+    corpora = []
+    names = set()
+    for entry in manifest['corpora']:
+        name = entry['name']
+        if name in names:
+            raise ValueError(f"Duplicate corpus name in {manifest_file}: {name}")
+        names.add(name)
+        corpora.append({
+            'name': name,
+            'coords': os.path.join(base_dir, entry['coords']),
+            'survey': os.path.join(base_dir, entry.get('survey', 'pid to survey.csv')),
+            'output_dir': os.path.join(base_dir, entry.get('output_dir', os.path.join('corpora', name)))
+        })
+    return corpora
+
+def _init_worker(memory_limit_gb):
+    """Pin native thread pools and apply the per-worker memory cap"""
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = '1'
+
+    if memory_limit_gb:
+        try:
+            import resource
+            limit = int(memory_limit_gb * 1024**3)
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError) as e:
+            print(f"⚠️  Cannot apply memory limit in worker {os.getpid()}: {e}")
+
+def _peak_rss_mb():
+    """Peak resident memory of this process in MB (None where unsupported)
+
+    ru_maxrss covers the whole process lifetime, which is one corpus because
+    every corpus runs in a fresh worker.
+    """
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+        return round(peak / 1024**2 if sys.platform == 'darwin' else peak / 1024, 1)
+    except ImportError:
+        return None
+
+def process_corpus(corpus):
+    """Worker task: load, cluster, compute statistics and export one corpus
+
+    Progress output goes to run.log in the corpus output directory.
+    """
+    import final_constructs_cluster_analysis as analysis
+    import output_manifest
+
+    start = time.perf_counter()
+    output_dir = corpus['output_dir']
+    os.makedirs(output_dir, exist_ok=True)
+
+    with open(os.path.join(output_dir, "run.log"), 'w', encoding='utf-8') as log, \
+            contextlib.redirect_stdout(log):
+        df = analysis.load_and_recluster_data(
+            corpus['coords'], corpus['survey'],
+            report_file=os.path.join(output_dir, analysis.DATA_QUALITY_FILE)
+        )
+        df.to_csv(os.path.join(output_dir, analysis.RECLUSTERED_FILE), index=False)
+        analysis.save_final_version_files(df, output_dir, include_visualization=False)
+        output_manifest.update_manifest(output_dir)
+
+    return {
+        'name': corpus['name'],
+        'output_dir': output_dir,
+        'rows': len(df),
+        'conversations': int(df['pid'].nunique()),
+        'seconds': round(time.perf_counter() - start, 2),
+        'peak_rss_mb': _peak_rss_mb(),
+        'worker_pid': os.getpid()
+    }
+
+def _start_worker(corpus, memory_limit_gb):
+    """Start one corpus in its own single-worker pool
+
+    A fresh process per corpus keeps peak memory per corpus and ties a crashed
+    worker (BrokenProcessPool) to the corpus that caused it, so the other
+    corpora in flight are unaffected.
+    """
+    executor = ProcessPoolExecutor(max_workers=1, initializer=_init_worker,
+                                   initargs=(memory_limit_gb,))
+    return executor, executor.submit(process_corpus, corpus)
+
+def run_shards(corpora, workers=None, memory_limit_gb=None, retries=DEFAULT_RETRIES):
+    """Process all corpora with at most `workers` running at once, retrying failed shards
+
+    Each attempt counts only against its own corpus, including when its worker
+    dies (e.g. killed by the OS or the memory cap).
+    Returns (results, failures) where failures maps name -> last error.
+    """
+    workers = workers or os.cpu_count() or 1
+    attempts = {corpus['name']: 0 for corpus in corpora}
+    results, failures = {}, {}
+
+    # Missing inputs will not appear on retry, so fail those shards up front
+    pending = deque()
+    for corpus in corpora:
+        if os.path.exists(corpus['coords']):
+            pending.append(corpus)
+        else:
+            print(f"❌ {corpus['name']}: coordinate file not found ({corpus['coords']})")
+            failures[corpus['name']] = f"coordinate file not found: {corpus['coords']}"
+
+    running = {}
+    while pending or running:
+        while pending and len(running) < workers:
+            corpus = pending.popleft()
+            executor, future = _start_worker(corpus, memory_limit_gb)
+            running[future] = (corpus, executor)
+
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            corpus, executor = running.pop(future)
+            executor.shutdown(wait=True)
+            name = corpus['name']
+            attempts[name] += 1
+            try:
+                result = future.result()
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                if attempts[name] <= retries:
+                    print(f"⚠️  {name}: attempt {attempts[name]} failed ({error}), retrying")
+                    pending.append(corpus)
+                else:
+                    print(f"❌ {name}: failed after {attempts[name]} attempts ({error})")
+                    failures[name] = error
+                continue
+
+            result['attempts'] = attempts[name]
+            results[name] = result
+            print(f"✅ {name}: {result['rows']:,} rows in {result['seconds']}s "
+                  f"(worker {result['worker_pid']}, peak {result['peak_rss_mb']} MB)")
+
+    return results, failures
+
+def merge_statistics(results, failures, output_dir):
+    """Combine per-corpus statistics and write the combined summary"""
+    import pandas as pd
+
+    os.makedirs(output_dir, exist_ok=True)
+    names = sorted(results)
+
+    # Per-corpus statistics as written by save_final_version_files
+    cluster_frames, survey_frames = [], []
+    for name in names:
+        corpus_dir = results[name]['output_dir']
+        cluster_frames.append(
+            pd.read_csv(os.path.join(corpus_dir, "cluster_analysis_statistics.csv")).assign(Corpus=name)
+        )
+        survey_file = os.path.join(corpus_dir, "survey_analysis_statistics.csv")
+        if os.path.exists(survey_file):
+            survey_frames.append(pd.read_csv(survey_file).assign(Corpus=name))
+
+    if cluster_frames:
+        combined_clusters = pd.concat(cluster_frames, ignore_index=True)
+        combined_clusters = combined_clusters[['Corpus'] + [c for c in combined_clusters.columns if c != 'Corpus']]
+        combined_clusters.to_csv(os.path.join(output_dir, "combined_cluster_statistics.csv"), index=False)
+
+    if survey_frames:
+        combined_surveys = pd.concat(survey_frames, ignore_index=True)
+        combined_surveys = combined_surveys[['Corpus'] + [c for c in combined_surveys.columns if c != 'Corpus']]
+        combined_surveys.to_csv(os.path.join(output_dir, "combined_survey_statistics.csv"), index=False)
+
+        # Survey totals across corpora (a conversation present in several corpora counts once per corpus)
+        survey_totals = (
+            combined_surveys.groupby('Survey')[['Total Points', 'Unique Conversations']]
+            .sum()
+            .reset_index()
+        )
+    else:
+        survey_totals = None
+
+    shard_table = pd.DataFrame(
+        [{'Corpus': name,
+          'Status': 'ok',
+          'Rows': results[name]['rows'],
+          'Conversations': results[name]['conversations'],
+          'Attempts': results[name]['attempts'],
+          'Seconds': results[name]['seconds'],
+          'Peak RSS MB': results[name]['peak_rss_mb'],
+          'Error': ''} for name in names] +
+        [{'Corpus': name, 'Status': 'failed', 'Error': error} for name, error in sorted(failures.items())]
+    )
+    for column in ['Rows', 'Conversations', 'Attempts']:
+        shard_table[column] = shard_table[column].astype('Int64')
+    shard_table.to_csv(os.path.join(output_dir, "shard_results.csv"), index=False)
+
+    summary_file = os.path.join(output_dir, "combined_summary.txt")
+    with open(summary_file, 'w') as f:
+        f.write("CONSTRUCTS CLUSTER ANALYSIS - COMBINED CORPORA SUMMARY\n")
+        f.write("="*50 + "\n\n")
+        f.write(f"- Corpora processed: {len(results)}\n")
+        f.write(f"- Corpora failed: {len(failures)}\n")
+        f.write(f"- Total data points: {sum(r['rows'] for r in results.values()):,}\n")
+        f.write(f"- Total conversations: {sum(r['conversations'] for r in results.values()):,}\n")
+
+        f.write("\nCORPORA:\n")
+        for name in names:
+            result = results[name]
+            f.write(f"- {name}: {result['rows']:,} points from {result['conversations']:,} conversations "
+                    f"({result['seconds']}s, {result['attempts']} attempt(s))\n")
+        for name, error in sorted(failures.items()):
+            f.write(f"- {name}: FAILED ({error})\n")
+
+        if survey_totals is not None:
+            f.write("\nSURVEY TOTALS:\n")
+            for _, row in survey_totals.iterrows():
+                f.write(f"- {row['Survey']}: {row['Total Points']:,} points from "
+                        f"{row['Unique Conversations']:,} conversations\n")
+
+    print(f"✅ Saved combined summary: {summary_file}")
+    return summary_file
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Run the cluster analysis for many corpora in parallel")
+    parser.add_argument('manifest', help="JSON manifest listing the corpora")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes (default: number of CPUs)")
+    parser.add_argument('--memory-per-worker', type=float, default=None,
+                        help="address-space cap per worker in GB (Unix only)")
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES,
+                        help="retries per failed corpus")
+    parser.add_argument('--output-dir', default=COMBINED_OUTPUT_DIR,
+                        help="directory for the combined statistics")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Main function"""
+    args = parse_args(argv)
+    corpora = load_corpora(args.manifest)
+    print(f"Processing {len(corpora)} corpora with {args.workers or os.cpu_count()} workers...")
+
+    start = time.perf_counter()
+    results, failures = run_shards(corpora, args.workers, args.memory_per_worker, args.retries)
+    merge_statistics(results, failures, args.output_dir)
+    print(f"Finished in {time.perf_counter() - start:.1f}s: {len(results)} succeeded, {len(failures)} failed")
+
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cross-Survey Cluster Comparison
+Survey x cluster contingency, survey overlap (Jaccard on pids) and chi-square
+enrichment, computed from sparse one-hot codes in a single pass over the rows
+(numpy, pandas and scipy.sparse only)
+"""
+
+import math
+import os
+
+CONTINGENCY_FILE = "survey_cluster_contingency.csv"
+ENRICHMENT_FILE = "survey_cluster_enrichment.csv"
+JACCARD_FILE = "survey_overlap_jaccard.csv"
+INDEPENDENCE_FILE = "survey_cluster_independence.txt"
+HEATMAP_FILE = "survey_comparison_heatmap.html"
+
+def _one_hot(codes, n_columns):
+    """Sparse (rows x n_columns) indicator matrix from integer codes"""
+    import numpy as np
+    from scipy import sparse
+
+    n_rows = len(codes)
+    return sparse.csr_matrix(
+        (np.ones(n_rows, dtype=np.int64), (np.arange(n_rows), codes)),
+        shape=(n_rows, n_columns)
+    )
+
+def chi2_sf(chi_square, dof):
+    """Survival function of the chi-square distribution for integer dof
+
+    Closed form of the regularized upper incomplete gamma function Q(dof/2, x/2),
+    summed in log space, so the p-value does not need scipy.stats.
+    """
+    half = chi_square / 2
+    if chi_square <= 0:
+        return 1.0
+    log_half = math.log(half)
+    if dof % 2 == 0:
+        terms = [i * log_half - math.lgamma(i + 1) for i in range(dof // 2)]
+        p_value = 0.0
+    else:
+        terms = [(i + 0.5) * log_half - math.lgamma(i + 1.5) for i in range(dof // 2)]
+        p_value = math.erfc(math.sqrt(half))
+    return min(1.0, p_value + sum(math.exp(term - half) for term in terms))
+
+def _chi_square(observed):
+    """Expected counts, observed/expected ratios and the chi-square statistic"""
+    import numpy as np
+
+    expected = observed.sum(axis=1, keepdims=True) * observed.sum(axis=0, keepdims=True) / observed.sum()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        enrichment = np.where(expected > 0, observed / expected, np.nan)
+        contributions = np.where(expected > 0, (observed - expected) ** 2 / expected, 0.0)
+    return enrichment, float(contributions.sum())
+
+def compute_survey_comparison(df, cluster_col='cluster_7'):
+    """Contingency, enrichment and overlap matrices for surveys vs clusters
+
+    Rows without a survey are ignored. The contingency and enrichment matrices
+    count data points (rows), matching the Total Points columns of the statistics
+    files. The merge repeats each coordinate once per construct, and those rows
+    are not independent observations, so the chi-square test, p-value and
+    Cramér's V are computed on unique (pid, x, y) points per survey instead.
+    """
+    import numpy as np
+    import pandas as pd
+
+    rows = df.dropna(subset=['survey_name'])
+    survey_codes, surveys = pd.factorize(rows['survey_name'], sort=True)
+    cluster_codes, clusters = pd.factorize(rows[cluster_col], sort=True)
+    pid_codes, pids = pd.factorize(rows['pid'])
+
+    survey_onehot = _one_hot(survey_codes, len(surveys))
+    survey_onehot_t = survey_onehot.T.tocsr()
+    cluster_onehot = _one_hot(cluster_codes, len(clusters))
+
+    # Survey x cluster point counts
+    observed = (survey_onehot_t @ cluster_onehot).toarray().astype(float)
+
+    # Survey x pid incidence -> pairwise intersections of the pid sets
+    incidence = survey_onehot_t @ _one_hot(pid_codes, len(pids))
+    incidence.data[:] = 1
+    intersections = (incidence @ incidence.T).toarray().astype(float)
+    set_sizes = np.diag(intersections)
+    unions = set_sizes[:, None] + set_sizes[None, :] - intersections
+    jaccard = np.divide(intersections, unions, out=np.zeros_like(intersections), where=unions > 0)
+
+    # Per-cell enrichment on rows; the test of independence on unique points
+    enrichment, _ = _chi_square(observed)
+    unique_points = ~rows.duplicated(subset=['pid', 'x', 'y', 'survey_name']).values
+    point_observed = (survey_onehot_t[:, unique_points] @ cluster_onehot[unique_points]).toarray().astype(float)
+    _, chi_square = _chi_square(point_observed)
+    n_points = point_observed.sum()
+    dof = max((len(surveys) - 1) * (len(clusters) - 1), 1)
+
+    survey_index = pd.Index(surveys, name='Survey')
+    cluster_columns = pd.Index(clusters, name='Cluster')
+    return {
+        'contingency': pd.DataFrame(observed.astype(int), index=survey_index, columns=cluster_columns),
+        'enrichment': pd.DataFrame(enrichment, index=survey_index, columns=cluster_columns).round(3),
+        'jaccard': pd.DataFrame(jaccard, index=survey_index, columns=pd.Index(surveys, name='Survey')).round(3),
+        'chi_square': chi_square,
+        'dof': dof,
+        'p_value': chi2_sf(chi_square, dof),
+        'cramers_v': float(np.sqrt(chi_square / (n_points * max(min(len(surveys), len(clusters)) - 1, 1)))),
+        'test_points': int(n_points)
+    }
+
+def comparison_heatmap_traces(comparison):
+    """Heatmap traces: survey x cluster enrichment and survey x survey Jaccard overlap"""
+    import numpy as np
+    import plotly.graph_objects as go
+
+    enrichment = comparison['enrichment']
+    contingency = comparison['contingency']
+    jaccard = comparison['jaccard']
+    cluster_labels = [f"Cluster {cluster}" for cluster in enrichment.columns]
+
+    enrichment_trace = go.Heatmap(
+        # Clipped so that clusters a survey never reaches show as -4 rather than -inf
+        z=np.log2(np.clip(enrichment.values.astype(float), 2 ** -4, None)),
+        x=cluster_labels,
+        y=list(enrichment.index),
+        customdata=np.dstack([contingency.values, enrichment.values]),
+        colorscale='RdBu',
+        reversescale=True,
+        zmid=0,
+        colorbar=dict(title='log2 enrichment', x=0.45),
+        hovertemplate='%{y} / %{x}<br>Points: %{customdata[0]}<br>'
+                      'Observed/expected: %{customdata[1]:.2f}<extra></extra>'
+    )
+    jaccard_trace = go.Heatmap(
+        z=jaccard.values,
+        x=list(jaccard.columns),
+        y=list(jaccard.index),
+        colorscale='Blues',
+        zmin=0,
+        zmax=1,
+        colorbar=dict(title='Jaccard'),
+        hovertemplate='%{y} vs %{x}<br>Jaccard (pids): %{z:.3f}<extra></extra>'
+    )
+    return enrichment_trace, jaccard_trace
+
+def create_comparison_figure(comparison):
+    """Figure with the enrichment and overlap heatmaps side by side"""
+    from plotly.subplots import make_subplots
+
+    fig = make_subplots(
+        rows=1, cols=2,
+        subplot_titles=('Survey x Cluster Enrichment (observed / expected)',
+                        'Survey Overlap (Jaccard on conversation IDs)'),
+        horizontal_spacing=0.2
+    )
+    enrichment_trace, jaccard_trace = comparison_heatmap_traces(comparison)
+    fig.add_trace(enrichment_trace, row=1, col=1)
+    fig.add_trace(jaccard_trace, row=1, col=2)
+    fig.update_layout(
+        title={
+            'text': (f"Cross-Survey Cluster Comparison - chi-square {comparison['chi_square']:.1f} "
+                     f"on {comparison['test_points']:,} unique points "
+                     f"(dof {comparison['dof']}, p={comparison['p_value']:.2g}, "
+                     f"Cramér's V {comparison['cramers_v']:.2f})"),
+            'x': 0.5,
+            'font': {'size': 16}
+        },
+        width=1400,
+        height=600
+    )
+    return fig
+
+def save_survey_comparison(comparison, output_dir):
+    """Save the contingency, enrichment and Jaccard matrices as CSV and the
+    independence test as text"""
+    os.makedirs(output_dir, exist_ok=True)
+    files = []
+    for key, file_name in [('contingency', CONTINGENCY_FILE),
+                           ('enrichment', ENRICHMENT_FILE),
+                           ('jaccard', JACCARD_FILE)]:
+        path = os.path.join(output_dir, file_name)
+        comparison[key].to_csv(path)
+        files.append(path)
+
+    path = os.path.join(output_dir, INDEPENDENCE_FILE)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("SURVEY x CLUSTER INDEPENDENCE (unique points)\n")
+        f.write("="*50 + "\n\n")
+        f.write(f"- Points tested: {comparison['test_points']:,}\n")
+        f.write(f"- Chi-square: {comparison['chi_square']:.2f} (dof {comparison['dof']}, p = {comparison['p_value']:.3g})\n")
+        f.write(f"- Cramér's V: {comparison['cramers_v']:.3f}\n")
+    files.append(path)
+    return files
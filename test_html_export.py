@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTML Export Tests
+Switching between HTML modes must not leave stale compressed copies or an
+unused shared bundle in the published artifacts
+
+Run with: python -m unittest test_html_export
+"""
+
+import os
+import tempfile
+import unittest
+
+try:
+    import plotly.graph_objects as go
+except ImportError:
+    go = None
+
+import html_export
+import output_manifest
+
+@unittest.skipIf(go is None, "plotly not installed")
+class ModeSwitchTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.html_file = os.path.join(self.tmp_dir.name, "figure.html")
+        self.fig = go.Figure(go.Scatter(x=[0, 1, 2], y=[2, 0, 1]))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_shared_gzip_then_standalone(self):
+        html_export.write_html(self.fig, self.html_file, mode='shared', compress=('gzip',))
+        self.assertTrue(os.path.exists(self.html_file + '.gz'))
+        self.assertIn(html_export.PLOTLYJS_FILE, output_manifest.build_manifest(self.tmp_dir.name))
+
+        html_export.write_html(self.fig, self.html_file, mode='standalone')
+        with open(self.html_file, encoding='utf-8') as f:
+            self.assertNotIn(f'src="{html_export.PLOTLYJS_FILE}"', f.read())
+        self.assertFalse(os.path.exists(self.html_file + '.gz'))
+
+        manifest = output_manifest.build_manifest(self.tmp_dir.name)
+        self.assertEqual(sorted(manifest), ["figure.html"])
+
+    def test_shared_gzip_then_shared_uncompressed(self):
+        html_export.write_html(self.fig, self.html_file, mode='shared', compress=('gzip',))
+        html_export.write_html(self.fig, self.html_file, mode='shared')
+
+        manifest = output_manifest.build_manifest(self.tmp_dir.name)
+        self.assertEqual(sorted(manifest), ["figure.html", html_export.PLOTLYJS_FILE])
+
+    def test_compressed_copy_older_than_html_is_excluded(self):
+        html_export.write_html(self.fig, self.html_file, mode='standalone', compress=('gzip',))
+        # Simulate an HTML file rewritten by something that did not refresh the copy
+        gz_time = os.path.getmtime(self.html_file + '.gz')
+        os.utime(self.html_file, (gz_time + 10, gz_time + 10))
+
+        manifest = output_manifest.build_manifest(self.tmp_dir.name)
+        self.assertEqual(sorted(manifest), ["figure.html"])
+
+if __name__ == "__main__":
+    unittest.main()
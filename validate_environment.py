@@ -11,6 +11,8 @@ Run this script to validate system environment and data files
 import sys
 import os
 import importlib
+import importlib.metadata
+import importlib.util
 from pathlib import Path
 
 def check_python_version():
@@ -30,32 +32,24 @@ def check_required_packages():
     """检查必需的Python包"""
     print("\n📦 包依赖检查...")
     
+    # 模块名 -> (发行包名, 最低版本)
+    # 通过包元数据读取版本，避免为检查而导入 sklearn/plotly/umap 等重量级模块
     required_packages = {
-        'numpy': '1.20.0',
-        'pandas': '1.3.0', 
-        'scipy': '1.7.0',
-        'sklearn': '1.0.0',
-        'plotly': '5.0.0',
-        'umap': '0.5.0'
+        'numpy': ('numpy', '1.20.0'),
+        'pandas': ('pandas', '1.3.0'),
+        'scipy': ('scipy', '1.7.0'),
+        'sklearn': ('scikit-learn', '1.0.0'),
+        'plotly': ('plotly', '5.0.0'),
+        'umap': ('umap-learn', '0.5.0')
     }
     
     all_good = True
     
-    for package_name, min_version in required_packages.items():
+    for package_name, (package_display, min_version) in required_packages.items():
         try:
-            if package_name == 'sklearn':
-                import sklearn
-                module = sklearn
-                package_display = 'scikit-learn'
-            elif package_name == 'umap':
-                import umap
-                module = umap
-                package_display = 'umap-learn'
-            else:
-                module = importlib.import_module(package_name)
-                package_display = package_name
-            
-            version = getattr(module, '__version__', 'unknown')
+            if importlib.util.find_spec(package_name) is None:
+                raise ImportError(package_name)
+            version = importlib.metadata.version(package_display)
             print(f"   ✅ {package_display}: {version}")
             
         except ImportError:
@@ -176,6 +170,286 @@ def test_core_functionality():
         print(f"   ❌ 功能测试失败: {e}")
         return False
 
+# 容量规划：对真实热点路径做计时微基准，并外推本机可处理的最大数据量
+# Capacity planning: time the real hot paths and extrapolate the largest dataset
+
+BENCHMARK_SIZES = [500, 1000, 2000, 4000]
+
+# 完整运行 (final_constructs_cluster_analysis.main) 中各阶段的执行次数
+PIPELINE_STAGE_COUNTS = {
+    'dedup': 1,
+    'ward': 1,
+    'merge': 1,
+    'statistics': 2,
+    'comparison': 1,
+    'index': 1,
+    'figure': 2,
+    'write_html': 2
+}
+
+# 各阶段的渐近复杂度指数 (Ward需要O(n²)的距离矩阵；KD树索引为O(n log n)，按线性近似；其余为线性)
+STAGE_COMPLEXITY = {
+    'dedup': 1,
+    'ward': 2,
+    'merge': 1,
+    'statistics': 1,
+    'comparison': 1,
+    'index': 1,
+    'figure': 1,
+    'write_html': 1
+}
+
+# 未计入模型的部分 (写入容量报告)
+NOT_MODELLED = "CSV/text file writes, manifest hashing, dependency import time"
+
+# 真实数据：约每个对话2.5个坐标点；每个对话有多行构念 (survey映射)，
+# 合并后每个坐标行平均扩展为约4.6行 (889 坐标行 -> 4,096 合并行)
+SYNTHETIC_POINTS_PER_PID = 2.5
+SYNTHETIC_MERGE_FAN_OUT = 4.6
+
+def _make_benchmark_data(n, seed=0):
+    """生成与真实数据结构相同的合成数据 (n 个坐标行 + 每个对话多行的survey映射)"""
+    import numpy as np
+    import pandas as pd
+    
+    rng = np.random.default_rng(seed)
+    n_pids = max(int(n / SYNTHETIC_POINTS_PER_PID), 1)
+    pids = np.array([f"pid-{i:06d}" for i in range(n_pids)])
+    coords = pd.DataFrame({
+        'pid': rng.choice(pids, n),
+        'x': rng.normal(size=n),
+        'y': rng.normal(size=n)
+    })
+    
+    # 每个对话至少1行构念，平均 SYNTHETIC_MERGE_FAN_OUT 行；同一对话的构念属于同一survey
+    surveys = np.array(['Construct Elaboration', 'Contrast and Reflection', 'Neutural', 'Positive', 'Praise'])
+    rows_per_pid = rng.poisson(SYNTHETIC_MERGE_FAN_OUT - 1, n_pids) + 1
+    survey_pids = np.repeat(pids, rows_per_pid)
+    construct_ids = np.arange(len(survey_pids))
+    survey_df = pd.DataFrame({
+        'conversation_id': survey_pids,
+        'construct': [f"pole a {i}" for i in construct_ids],
+        'construct_bipolar': [f"pole b {i}" for i in construct_ids],
+        'survey_name': np.repeat(rng.choice(surveys, n_pids), rows_per_pid)
+    })
+    return coords, survey_df
+
+def _measure(func):
+    """运行函数两次，返回 (结果, 耗时秒数, 峰值内存字节数)
+    
+    tracemalloc 会显著拖慢大量分配Python对象的代码 (图表构建约5倍)，
+    因此计时在关闭跟踪的运行中进行，峰值内存在另一次跟踪运行中测量。
+    """
+    import time
+    import tracemalloc
+    
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+def _fit_scaling(sizes, values, exponent):
+    """拟合 value = fixed + k * n^exponent (最小二乘，系数不为负)，返回 (fixed, k)"""
+    import numpy as np
+    
+    n = np.asarray(sizes, dtype=float)
+    v = np.asarray(values, dtype=float)
+    design = np.column_stack([np.ones_like(n), n ** exponent])
+    (fixed, k), *_ = np.linalg.lstsq(design, v, rcond=None)
+    if k < 0:
+        fixed, k = float(v.mean()), 0.0
+    elif fixed < 0:
+        fixed, k = 0.0, float((v * n ** exponent).sum() / (n ** (2 * exponent)).sum())
+    return float(fixed), float(k)
+
+def benchmark_hot_paths(sizes=BENCHMARK_SIZES):
+    """对完整运行中的各阶段计时：去重、Ward聚类、survey合并、统计、
+    跨survey比较 (含热力图)、近邻索引、图表构建和 write_html
+    
+    n 为坐标行数 (合并前)。合成的survey映射每个对话有多行构念，合并后的行数约为
+    n 的 SYNTHETIC_MERGE_FAN_OUT 倍，与真实数据一致；合并后的各阶段按合并行计时。
+    """
+    print("\n⏱️  热点路径基准测试...")
+    
+    import contextlib
+    import io
+    import tempfile
+    from sklearn.cluster import AgglomerativeClustering
+    import final_constructs_cluster_analysis as analysis
+    import cluster_index
+    import survey_comparison
+    
+    results = {stage: {'sizes': [], 'seconds': [], 'peak_bytes': []} for stage in PIPELINE_STAGE_COUNTS}
+    results['merge']['merged_rows'] = []
+    
+    def ward(coords):
+        return AgglomerativeClustering(n_clusters=7, linkage='ward').fit_predict(coords[['x', 'y']].values)
+    
+    def merge(coords, survey_df):
+        merged = coords.merge(survey_df, left_on='pid', right_on='conversation_id', how='left')
+        merged['pole_a'] = merged['construct']
+        merged['pole_b'] = merged['construct_bipolar']
+        return merged
+    
+    def comparison(merged):
+        result = survey_comparison.compute_survey_comparison(merged)
+        return survey_comparison.create_comparison_figure(result).to_html()
+    
+    def index(merged):
+        return cluster_index.compute_representatives(cluster_index.build_index(merged))
+    
+    def record(stage, n, func):
+        # 使用分析脚本中的真实函数，屏蔽其进度输出
+        with contextlib.redirect_stdout(io.StringIO()):
+            result, seconds, peak = _measure(func)
+        results[stage]['sizes'].append(n)
+        results[stage]['seconds'].append(seconds)
+        results[stage]['peak_bytes'].append(peak)
+        return result
+    
+    # 预热，避免首次调用的初始化开销 (如plotly校验器加载) 污染小规模的计时
+    warm_coords, warm_survey = _make_benchmark_data(100)
+    warm_coords['cluster_7'] = ward(warm_coords)
+    warm_merged = merge(warm_coords, warm_survey)
+    with contextlib.redirect_stdout(io.StringIO()):
+        analysis.create_interactive_plot_with_surveys(warm_merged).to_html()
+        comparison(warm_merged)
+        index(warm_merged)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        html_file = os.path.join(tmp_dir, 'benchmark.html')
+        
+        for n in sizes:
+            coords, survey_df = _make_benchmark_data(n)
+            
+            record('dedup', n, lambda: analysis.deduplicate_points(coords))
+            coords['cluster_7'] = record('ward', n, lambda: ward(coords))
+            merged = record('merge', n, lambda: merge(coords, survey_df))
+            results['merge']['merged_rows'].append(len(merged))
+            record('statistics', n, lambda: analysis.create_statistics(merged))
+            record('comparison', n, lambda: comparison(merged))
+            record('index', n, lambda: index(merged))
+            fig = record('figure', n, lambda: analysis.create_interactive_plot_with_surveys(merged))
+            record('write_html', n, lambda: fig.write_html(html_file))
+            
+            print(f"   n={n:,} ({len(merged):,} merged rows): " + ", ".join(
+                f"{stage} {data['seconds'][-1]:.3f}s" for stage, data in results.items()
+            ))
+    
+    return results
+
+def estimate_capacity(results, time_budget_s, memory_budget_bytes):
+    """根据基准结果外推在时间/内存预算内可处理的最大数据点数"""
+    models = {}
+    for stage, data in results.items():
+        exponent = STAGE_COMPLEXITY[stage]
+        models[stage] = {
+            'time': _fit_scaling(data['sizes'], data['seconds'], exponent),
+            'memory': _fit_scaling(data['sizes'], data['peak_bytes'], exponent)
+        }
+    
+    def predict(n):
+        total_time = 0.0
+        peak_memory = 0.0
+        for stage, model in models.items():
+            exponent = STAGE_COMPLEXITY[stage]
+            fixed, k = model['time']
+            total_time += PIPELINE_STAGE_COUNTS[stage] * (fixed + k * n ** exponent)
+            # 各阶段顺序执行，峰值内存取各阶段峰值的最大值
+            fixed, k = model['memory']
+            peak_memory = max(peak_memory, fixed + k * n ** exponent)
+        return total_time, peak_memory
+    
+    def fits(n):
+        total_time, peak_memory = predict(n)
+        return total_time <= time_budget_s and peak_memory <= memory_budget_bytes
+    
+    # 指数扩张后二分查找满足预算的最大 n
+    low, high = 0, 1000
+    while fits(high) and high < 10**9:
+        low, high = high, high * 2
+    while high - low > 1:
+        mid = (low + high) // 2
+        if fits(mid):
+            low = mid
+        else:
+            high = mid
+    
+    if low == 0:
+        limited_by = 'time' if predict(1)[0] > time_budget_s else 'memory'
+    else:
+        next_time, next_memory = predict(low + 1)
+        limited_by = 'time' if next_time > time_budget_s else 'memory'
+    predicted_time, predicted_memory = predict(low) if low else (0.0, 0.0)
+    
+    return {
+        'models': models,
+        'max_points': low,
+        'limited_by': limited_by,
+        'predicted_seconds': predicted_time,
+        'predicted_peak_bytes': predicted_memory
+    }
+
+def _default_memory_budget_gb():
+    """默认内存预算：可用内存 (psutil 不可用时为 4GB)"""
+    try:
+        import psutil
+        return psutil.virtual_memory().available / (1024**3)
+    except ImportError:
+        return 4.0
+
+def run_capacity_planning(time_budget_s, memory_budget_gb, sizes=BENCHMARK_SIZES):
+    """运行基准测试并输出容量规划结果"""
+    results = benchmark_hot_paths(sizes)
+    capacity = estimate_capacity(results, time_budget_s, memory_budget_gb * 1024**3)
+    
+    print("\n📈 容量规划...")
+    for stage, model in capacity['models'].items():
+        fixed, k = model['time']
+        print(f"   {stage}: time ≈ {fixed:.3f} + {k:.3e} * n^{STAGE_COMPLEXITY[stage]} s")
+    print(f"   预算: {time_budget_s:g} s, {memory_budget_gb:.1f} GB")
+    print(f"   ✅ 可处理的最大坐标行数 (合并前): {capacity['max_points']:,} (受限于 {capacity['limited_by']})")
+    print(f"   未计入: {NOT_MODELLED}")
+    
+    return results, capacity
+
+def format_capacity_report(results, capacity, time_budget_s, memory_budget_gb):
+    """将基准和容量结果格式化为 key: value 行"""
+    lines = [
+        "",
+        "[capacity]",
+        f"time_budget_s: {time_budget_s:g}",
+        f"memory_budget_gb: {memory_budget_gb:.2f}",
+        f"max_points: {capacity['max_points']}",
+        "max_points_unit: coordinate rows (before the survey merge)",
+        f"limited_by: {capacity['limited_by']}",
+        f"predicted_seconds: {capacity['predicted_seconds']:.2f}",
+        f"predicted_peak_mb: {capacity['predicted_peak_bytes'] / 1024**2:.1f}",
+        f"not_modelled: {NOT_MODELLED}",
+        "",
+        "[benchmark]"
+    ]
+    for stage, data in results.items():
+        exponent = STAGE_COMPLEXITY[stage]
+        fixed, k = capacity['models'][stage]['time']
+        mem_fixed, mem_k = capacity['models'][stage]['memory']
+        lines.append(f"{stage}.runs_per_pipeline: {PIPELINE_STAGE_COUNTS[stage]}")
+        lines.append(f"{stage}.sizes: {','.join(str(n) for n in data['sizes'])}")
+        if 'merged_rows' in data:
+            lines.append(f"{stage}.merged_rows: {','.join(str(rows) for rows in data['merged_rows'])}")
+        lines.append(f"{stage}.seconds: {','.join(f'{t:.4f}' for t in data['seconds'])}")
+        lines.append(f"{stage}.peak_mb: {','.join(f'{m / 1024**2:.2f}' for m in data['peak_bytes'])}")
+        lines.append(f"{stage}.time_model_s: {fixed:.4e} + {k:.4e} * n^{exponent}")
+        lines.append(f"{stage}.memory_model_bytes: {mem_fixed:.4e} + {mem_k:.4e} * n^{exponent}")
+    return "\n".join(lines) + "\n"
+
 def generate_report():
     """生成验证报告"""
     print("\n" + "="*50)
@@ -208,8 +482,26 @@ def generate_report():
     
     return all_passed
 
-def main():
+def parse_args(argv=None):
+    """解析命令行参数"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Environment and data validation")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="运行热点路径基准测试并估算最大可处理数据量")
+    parser.add_argument('--time-budget', type=float, default=60.0,
+                        help="完整运行的时间预算 (秒，默认60)")
+    parser.add_argument('--memory-budget', type=float, default=None,
+                        help="内存预算 (GB，默认为当前可用内存)")
+    parser.add_argument('--sizes', type=lambda text: [int(n) for n in text.split(',')],
+                        default=BENCHMARK_SIZES,
+                        help="基准测试的数据点数，逗号分隔 (默认 500,1000,2000,4000)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """主函数"""
+    args = parse_args(argv)
+    
     print("🔍 双极构念聚类分析系统 - 环境验证")
     print("Bipolar Constructs Clustering Analysis - Environment Validation")
     print("-" * 60)
@@ -217,12 +509,23 @@ def main():
     # 运行所有检查并生成报告
     success = generate_report()
     
+    capacity_report = ""
+    if args.benchmark:
+        memory_budget_gb = args.memory_budget or _default_memory_budget_gb()
+        try:
+            results, capacity = run_capacity_planning(args.time_budget, memory_budget_gb, args.sizes)
+            capacity_report = format_capacity_report(results, capacity, args.time_budget, memory_budget_gb)
+        except Exception as e:
+            print(f"   ❌ 基准测试失败: {e}")
+            success = False
+    
     # 保存验证结果
     import datetime
     with open('validation_result.txt', 'w', encoding='utf-8') as f:
         f.write(f"环境验证结果: {'通过' if success else '失败'}\n")
         f.write(f"验证时间: {datetime.datetime.now()}\n")
         f.write(f"Python版本: {sys.version}\n")
+        f.write(capacity_report)
     
     print(f"\n验证结果已保存到: validation_result.txt")
     
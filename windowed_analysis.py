@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Survey-Time Windowed Analysis
+Partition the re-clustered dataset by survey end date and maintain per-partition
+partial aggregates incrementally, so only new or changed partitions are re-aggregated
+"""
+
+import argparse
+import os
+import sys
+
+PARTITION_DIR = "partitions"
+FREQUENCIES = ('daily', 'weekly')
+
+# Rows whose survey end time is missing (e.g. pids without a survey) go here
+UNDATED_PARTITION = "undated"
+
+# Columns that determine a partition's aggregates; a change in any of them
+# (including re-assigned cluster labels) marks the partition for reprocessing
+FINGERPRINT_COLUMNS = ['pid', 'x', 'y', 'cluster_7', 'survey_name']
+
+def assign_partitions(df, freq='weekly'):
+    """Return the partition key (period start date) for every row"""
+    import pandas as pd
+
+    if freq not in FREQUENCIES:
+        raise ValueError(f"Unknown frequency '{freq}', expected one of {FREQUENCIES}")
+
+    if 'survey_endTime' in df.columns:
+        end_times = pd.to_datetime(df['survey_endTime'], utc=True, errors='coerce')
+    else:
+        end_times = pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns, UTC]')
+
+    starts = end_times.dt.floor('D')
+    if freq == 'weekly':
+        # Weeks start on Monday
+        starts = starts - pd.to_timedelta(starts.dt.dayofweek, unit='D')
+
+    return starts.dt.strftime('%Y-%m-%d').fillna(UNDATED_PARTITION)
+
+def partition_fingerprints(df, keys):
+    """Order-independent content hash of every partition
+
+    Rows are hashed once with the vectorized hash_pandas_object and the hashes
+    are summed per partition key. Returns a DataFrame indexed by partition with
+    'rows' and 'fingerprint' columns.
+    """
+    import pandas as pd
+
+    columns = [col for col in FINGERPRINT_COLUMNS if col in df.columns]
+    row_hashes = pd.util.hash_pandas_object(df[columns], index=False)
+    grouped = row_hashes.groupby(keys.values, sort=True)
+    return pd.DataFrame({
+        'rows': grouped.size(),
+        'fingerprint': grouped.sum().map(lambda total: f"{int(total) & 0xFFFFFFFFFFFFFFFF:016x}")
+    })
+
+def aggregate_partition(partition_df):
+    """Partial aggregate: point counts per (cluster, survey, pid)
+
+    Keeping pid in the key lets unique-conversation counts be rolled up exactly
+    across partitions without going back to the raw rows.
+    """
+    group_columns = ['cluster_7', 'survey_name', 'pid']
+    if 'survey_name' not in partition_df.columns:
+        partition_df = partition_df.assign(survey_name=None)
+    return (
+        partition_df.groupby(group_columns, dropna=False)
+        .size()
+        .reset_index(name='points')
+    )
+
+def _manifest_file(store_dir):
+    return os.path.join(store_dir, "manifest.csv")
+
+def _partition_file(store_dir, partition):
+    return os.path.join(store_dir, f"part_{partition}.csv")
+
+def load_manifest(store_dir):
+    """Load the processed-partition manifest (partition -> rows, fingerprint)"""
+    import pandas as pd
+
+    manifest_file = _manifest_file(store_dir)
+    if not os.path.exists(manifest_file):
+        return {}
+    manifest_df = pd.read_csv(manifest_file, dtype={'partition': str, 'fingerprint': str})
+    return {
+        row['partition']: {'rows': int(row['rows']), 'fingerprint': row['fingerprint']}
+        for _, row in manifest_df.iterrows()
+    }
+
+def save_manifest(store_dir, manifest):
+    """Save the processed-partition manifest"""
+    import pandas as pd
+
+    manifest_df = pd.DataFrame(
+        [{'partition': key, **value} for key, value in sorted(manifest.items())],
+        columns=['partition', 'rows', 'fingerprint']
+    )
+    manifest_df.to_csv(_manifest_file(store_dir), index=False)
+
+def update_partitions(df, freq='weekly', partition_dir=PARTITION_DIR):
+    """Write partial aggregates for new or changed partitions only
+
+    Returns (store_dir, processed, skipped, removed) partition key lists.
+    """
+    store_dir = os.path.join(partition_dir, freq)
+    os.makedirs(store_dir, exist_ok=True)
+
+    manifest = load_manifest(store_dir)
+    keys = assign_partitions(df, freq)
+    fingerprints = partition_fingerprints(df, keys)
+
+    changed, skipped = [], []
+    for partition, current in fingerprints.iterrows():
+        previous = manifest.get(partition)
+        if (previous is not None
+                and previous['fingerprint'] == current['fingerprint']
+                and os.path.exists(_partition_file(store_dir, partition))):
+            skipped.append(partition)
+        else:
+            changed.append(partition)
+
+    # Only the rows of new or changed partitions are grouped and aggregated
+    changed_rows = keys.isin(changed).values
+    processed = []
+    for partition, partition_df in df[changed_rows].groupby(keys[changed_rows], sort=True):
+        aggregate_partition(partition_df).to_csv(_partition_file(store_dir, partition), index=False)
+        manifest[partition] = {'rows': int(fingerprints.at[partition, 'rows']),
+                               'fingerprint': fingerprints.at[partition, 'fingerprint']}
+        processed.append(partition)
+
+    # Drop partitions that no longer exist in the data
+    current = set(fingerprints.index)
+    removed = sorted(key for key in manifest if key not in current)
+    for partition in removed:
+        partition_file = _partition_file(store_dir, partition)
+        if os.path.exists(partition_file):
+            os.remove(partition_file)
+        del manifest[partition]
+
+    save_manifest(store_dir, manifest)
+    return store_dir, processed, skipped, removed
+
+def load_partial_aggregates(store_dir):
+    """Concatenate the stored partial aggregates with their partition key"""
+    import pandas as pd
+
+    manifest = load_manifest(store_dir)
+    partials = []
+    for partition in sorted(manifest):
+        partial = pd.read_csv(_partition_file(store_dir, partition))
+        partial.insert(0, 'partition', partition)
+        partials.append(partial)
+
+    if not partials:
+        return pd.DataFrame(columns=['partition', 'cluster_7', 'survey_name', 'pid', 'points'])
+    return pd.concat(partials, ignore_index=True)
+
+def time_sliced_distribution(partials):
+    """Points and conversations per partition, cluster and survey"""
+    return (
+        partials.groupby(['partition', 'cluster_7', 'survey_name'], dropna=False)
+        .agg(points=('points', 'sum'), conversations=('pid', 'nunique'))
+        .reset_index()
+        .rename(columns={'partition': 'Period', 'cluster_7': 'Cluster', 'survey_name': 'Survey',
+                         'points': 'Points', 'conversations': 'Conversations'})
+    )
+
+def rollup_cluster_statistics(partials):
+    """Roll the partial aggregates up to per-cluster totals"""
+    # Undated rows count towards the totals but not towards the period range
+    dated_partition = partials['partition'].where(partials['partition'] != UNDATED_PARTITION)
+    rollup = (
+        partials.assign(dated_partition=dated_partition)
+        .groupby('cluster_7')
+        .agg(
+            points=('points', 'sum'),
+            conversations=('pid', 'nunique'),
+            surveys=('survey_name', 'nunique'),
+            periods=('dated_partition', 'nunique'),
+            first_period=('dated_partition', 'min'),
+            last_period=('dated_partition', 'max')
+        )
+        .reset_index()
+    )
+    return rollup.rename(columns={
+        'cluster_7': 'Cluster',
+        'points': 'Total Points',
+        'conversations': 'Unique Conversations',
+        'surveys': 'Surveys Represented',
+        'periods': 'Periods Represented',
+        'first_period': 'First Period',
+        'last_period': 'Last Period'
+    })
+
+def run_windowed_analysis(df, freq='weekly', partition_dir=PARTITION_DIR):
+    """Update the partition store and write time-sliced and rolled-up statistics"""
+    print(f"Partitioning {len(df):,} records by survey end time ({freq})...")
+    store_dir, processed, skipped, removed = update_partitions(df, freq, partition_dir)
+    print(f"Processed {len(processed)} new/changed partitions, "
+          f"skipped {len(skipped)} unchanged, removed {len(removed)}")
+
+    partials = load_partial_aggregates(store_dir)
+
+    sliced = time_sliced_distribution(partials)
+    sliced_file = os.path.join(store_dir, "time_sliced_distribution.csv")
+    sliced.to_csv(sliced_file, index=False)
+    print(f"✅ Saved time-sliced distribution: {sliced_file}")
+
+    rollup = rollup_cluster_statistics(partials)
+    rollup_file = os.path.join(store_dir, "windowed_cluster_statistics.csv")
+    rollup.to_csv(rollup_file, index=False)
+    print(f"✅ Saved rolled-up cluster statistics: {rollup_file}")
+
+    return sliced, rollup
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Survey-time windowed cluster analysis")
+    parser.add_argument('--input', default="umap_coordinates_7clusters_with_surveys.csv",
+                        help="re-clustered dataset written by the cluster step")
+    parser.add_argument('--freq', choices=FREQUENCIES, default='weekly',
+                        help="partition granularity")
+    parser.add_argument('--partition-dir', default=PARTITION_DIR,
+                        help="directory holding the partial aggregates")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Main function"""
+    import pandas as pd
+
+    args = parse_args(argv)
+    df = pd.read_csv(args.input)
+    run_windowed_analysis(df, args.freq, args.partition_dir)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())